@@ -0,0 +1,49 @@
+# bench_actors.py - experience throughput of the actor pool for 1..K actors
+# Run from the repository root: python -m benchmarks.bench_actors [max_actors] [seconds]
+import os
+import sys
+import time
+
+import torch
+
+from scripts.actors import ActorPool
+from scripts.dqn_agent import DQNAgent
+
+STATE_DIM = 14
+
+
+def measure(agent, num_actors, seconds):
+    """Transitions/s and episodes/hour collected by num_actors while the learner only drains"""
+    pool = ActorPool(num_actors)
+    pool.start(agent)
+    try:
+        # Let the processes finish importing before timing
+        time.sleep(2.0)
+        pool.drain(agent)
+        received = pool.transitions_received
+        episodes = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            episodes += len(pool.drain(agent))
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        return (pool.transitions_received - received) / elapsed, episodes / elapsed * 3600
+    finally:
+        pool.close()
+
+
+def main(max_actors=os.cpu_count(), seconds=10.0):
+    agent = DQNAgent(STATE_DIM, device=torch.device('cpu'))
+    agent.epsilon = 0.1
+
+    print(f"{'actors':>6} {'transitions/s':>14} {'episodes/hour':>14}")
+    num_actors = 1
+    while num_actors <= max_actors:
+        steps, episodes = measure(agent, num_actors, seconds)
+        print(f"{num_actors:6d} {steps:14.0f} {episodes:14.0f}")
+        num_actors *= 2
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else os.cpu_count(), float(args[1]) if len(args) > 1 else 10.0)
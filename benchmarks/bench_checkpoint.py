@@ -0,0 +1,73 @@
+# bench_checkpoint.py - checkpoint save/load time with a full replay buffer
+# Run from the repository root: python -m benchmarks.bench_checkpoint
+import os
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+from scripts.dqn_agent import DQNAgent
+from scripts.replaybuffer import replaybuffer_from_dict
+
+STATE_DIM = 14
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def legacy_save(agent, path):
+    """The pre-npy checkpoint: buffer embedded as nested lists and pickled"""
+    checkpoint = {'model_state_dict': agent.policy_net.state_dict(), 'replay_buffer': agent.replay_buffer.to_dict()}
+    torch.save(checkpoint, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def legacy_load(path):
+    checkpoint = torch.load(path, weights_only=False)
+    return replaybuffer_from_dict(checkpoint['replay_buffer'])
+
+
+def main(capacity=100000):
+    agent = DQNAgent(STATE_DIM, device=torch.device('cpu'))
+    rng = np.random.default_rng(0)
+    agent.replay_buffer.add_batch(
+        rng.random((capacity, STATE_DIM), dtype=np.float32), rng.integers(0, 6, capacity),
+        rng.standard_normal(capacity, dtype=np.float32), rng.random((capacity, STATE_DIM), dtype=np.float32),
+        rng.random(capacity) < 0.01)
+
+    with tempfile.TemporaryDirectory() as directory:
+        legacy_path = os.path.join(directory, "legacy.pt")
+        path = os.path.join(directory, "model.pt")
+        agent.model_path = path
+
+        results = [
+            ("legacy save (to_dict)", timed(lambda: legacy_save(agent, legacy_path))),
+            ("legacy load (from_dict)", timed(lambda: legacy_load(legacy_path))),
+            ("npy save (blocking)", timed(lambda: agent.save_model(path, wait=True))),
+            ("npy save (loop stall)", timed(lambda: agent.save_model(path))),
+        ]
+        agent.checkpoint_writer.flush()
+        loaded = DQNAgent(STATE_DIM, device=torch.device('cpu'))
+        results.append(("npy load (mmap)", timed(lambda: loaded.load_model(path))))
+        loaded.model_path = path
+        results.append(("mmap save (blocking)", timed(lambda: loaded.save_model(path, wait=True))))
+        results.append(("mmap save (loop stall)", timed(lambda: loaded.save_model(path))))
+        # A burst of requests while a write is running coalesces into one more write
+        written = loaded.checkpoint_writer.saves_written
+        results.append(("10 saves (loop stall)", timed(lambda: [loaded.save_model(path) for _ in range(10)])))
+        loaded.checkpoint_writer.flush()
+        coalesced = loaded.checkpoint_writer.saves_written - written
+        results.append(("first sample after load", timed(lambda: loaded.replay_buffer.sample(128))))
+
+    print(f"Checkpoint with a full {capacity} transition buffer")
+    for name, seconds in results:
+        print(f"  {name:26s} {seconds * 1000:9.1f} ms")
+    print(f"  10 queued saves -> {coalesced} writes")
+
+
+if __name__ == "__main__":
+    main()
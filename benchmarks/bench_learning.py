@@ -0,0 +1,85 @@
+# bench_learning.py - learning curves of replay/return variants on the same env-step budget
+# Run from the repository root: python -m benchmarks.bench_learning [env_steps] [variant ...]
+import random
+import sys
+import time
+from collections import deque
+
+import numpy as np
+import torch
+
+from scripts.SimConstants import TRAIN_FREQ, GRADIENT_STEPS, LEARNING_STARTS
+from scripts.dqn_agent import DQNAgent
+from scripts.rewards import calculate_rewards
+from scripts.vecenv import VecAIEnvironment
+
+STATE_DIM = 14
+WIN_RATE_TARGET = 0.9
+CORNER_CHECKPOINTS = 4  # average checkpoints once the CP 3-4 corner is learned
+
+# DQNAgent keyword arguments per variant
+VARIANTS = {
+    "uniform": {},
+    "prioritized": {"prioritized_replay": True},
+    "3-step": {"n_step": 3},
+}
+
+
+def train(agent_kwargs, env_steps, num_envs=16, report_every=20000, seed=0):
+    """Fresh agent trained for env_steps; returns [(env steps, episodes, avg checkpoints, win rate)]"""
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+    # Same training schedule as the Trainer; variants only change replay / returns
+    schedule = dict(train_freq=TRAIN_FREQ, gradient_steps=GRADIENT_STEPS, learning_starts=LEARNING_STARTS)
+    agent = DQNAgent(STATE_DIM, device=torch.device('cpu'), **{**schedule, **agent_kwargs})
+    env = VecAIEnvironment(num_envs, reward_fn=calculate_rewards)  # rewards summed over ACTION_REPEAT frames
+    states = env.reset()
+    checkpoints = deque(maxlen=100)
+    finishes = deque(maxlen=100)
+    episodes = 0
+    curve = []
+
+    for step in range(1, env_steps // num_envs + 1):
+        actions = agent.get_actions(states)
+        next_states, infos, dones = env.step(actions)
+        agent.store_experiences(states, actions, infos['reward'], infos['terminal_state'], dones)
+        agent.train(num_envs)
+        states = next_states
+
+        for i in np.flatnonzero(dones):
+            episodes += 1
+            checkpoints.append(infos['checkpoints'][i])
+            finishes.append(infos['finished'][i])
+
+        if step * num_envs % report_every < num_envs:
+            win_rate = float(np.mean(finishes)) if finishes else 0.0
+            avg_cp = float(np.mean(checkpoints)) if checkpoints else 0.0
+            curve.append((step * num_envs, episodes, avg_cp, win_rate))
+    return curve
+
+
+def main(env_steps=400000, variants=tuple(VARIANTS)):
+    results = {}
+    for name in variants:
+        start = time.perf_counter()
+        results[name] = train(VARIANTS[name], env_steps)
+        print(f"{name}: {time.perf_counter() - start:.0f}s")
+
+    print(f"\n{'env steps':>10} | " + " | ".join(f"{name:^22}" for name in results))
+    print(f"{'':>10} | " + " | ".join(f"{'episodes':>8} {'avg CP':>6} {'win %':>6}" for _ in results))
+    for rows in zip(*results.values()):
+        cells = [f"{episodes:8d} {avg_cp:6.1f} {win * 100:6.0f}" for _, episodes, avg_cp, win in rows]
+        print(f"{rows[0][0]:10d} | " + " | ".join(cells))
+
+    for name, curve in results.items():
+        corner = next((steps for steps, _, cp, _ in curve if cp >= CORNER_CHECKPOINTS), None)
+        reached = next((steps for steps, _, _, win in curve if win >= WIN_RATE_TARGET), None)
+        print(f"{name}: avg CP >= {CORNER_CHECKPOINTS} " + (f"after {corner}" if corner else "not reached") +
+              f", {WIN_RATE_TARGET:.0%} win rate " + (f"after {reached} env steps" if reached else "not reached"))
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 400000, tuple(args[1:]) or tuple(VARIANTS))
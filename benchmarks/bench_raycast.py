@@ -0,0 +1,135 @@
+# bench_raycast.py - rays/second for the original 8px march vs the compiled caster
+# Run from the repository root: python -m benchmarks.bench_raycast
+import os
+import random
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+from scripts.Constants import *
+from scripts.Car import Car
+from scripts.Obstacle import Obstacle
+from scripts.raycast import TrackField, RayCaster, obstacle_boxes, ray_directions, sphere_trace, march_rays
+
+
+def sample_poses(count, seed=0):
+    """Car poses spread around the checkpoint line centres"""
+    rng = random.Random(seed)
+    poses = []
+    for _ in range(count):
+        (x1, y1), (x2, y2) = rng.choice(TRACK_CHECKPOINT_ZONES)
+        t = rng.uniform(0.2, 0.8)
+        poses.append((x1 + (x2 - x1) * t, y1 + (y2 - y1) * t, rng.uniform(0, 360)))
+    return poses
+
+
+def legacy_cast(car, border_mask, obstacle_group):
+    """The pre-compiled Car.cast_rays loop: Vector2 steps, mask.get_at and per-sprite checks"""
+    from pygame.math import Vector2
+    width, height = border_mask.get_size()
+    for idx, angle in enumerate(car.ray_angles):
+        ray_dir = Vector2(0, -1).rotate(-angle).rotate(-car.angle)
+        min_dist = car.ray_length
+        for dist in range(8, car.ray_length + 1, 8):
+            end_pos = car.position + ray_dir * dist
+            x, y = int(end_pos.x), int(end_pos.y)
+            if not (0 <= x < width and 0 <= y < height):
+                break
+            if border_mask.get_at((x, y)):
+                min_dist = dist
+                break
+            for obstacle in obstacle_group:
+                if obstacle.rect.collidepoint(x, y):
+                    if obstacle.mask.get_at((x - obstacle.rect.x, y - obstacle.rect.y)):
+                        min_dist = dist
+                        break
+            if min_dist < car.ray_length:
+                break
+        car.ray_distances[idx] = min_dist
+
+
+def time_caster(cast, poses, repeat=3):
+    """Best-of-repeat seconds to cast every pose once"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for pose in poses:
+            cast(pose)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(num_poses=500):
+    pygame.display.set_mode((WIDTH, HEIGHT))
+
+    start = time.perf_counter()
+    border = pygame.mask.from_surface(pygame.image.load(TRACK_BORDER).convert_alpha())
+    field = TrackField.from_mask(border)
+    field.distance
+    compile_time = time.perf_counter() - start
+
+    random.seed(0)
+    obstacles = Obstacle(0, 0, show_image=False).generate_obstacles(15)
+    boxes = obstacle_boxes(obstacles)
+    car = Car(*CAR_START_POS)
+    poses = sample_poses(num_poses)
+    rays = len(car.ray_angles) * len(poses)
+
+    def march(pose):
+        x, y, angle = pose
+        return march_rays(field, (x, y), ray_directions(car.ray_angles, angle), car.ray_length, boxes)
+
+    def trace(pose):
+        x, y, angle = pose
+        return sphere_trace(field, (x, y), ray_directions(car.ray_angles, angle), car.ray_length, boxes)
+
+    def legacy(pose):
+        x, y, angle = pose
+        car.position.update(x, y)
+        car.angle = angle
+        legacy_cast(car, border, obstacles)
+
+    legacy_time = time_caster(legacy, poses)
+    caster = RayCaster(car.ray_angles, car.ray_length)
+
+    def grid(pose):
+        x, y, angle = pose
+        return caster.cast(field, (x, y), angle, boxes)[0]
+
+    march_time = time_caster(march, poses)
+    trace_time = time_caster(trace, poses)
+    grid_time = time_caster(grid, poses)
+
+    deltas = np.array([np.subtract(march(p), trace(p)) for p in poses]).ravel()
+    agree = np.mean((deltas > -1) & (deltas < 8))
+
+    print(f"Track compile:     {compile_time * 1000:8.1f} ms")
+    print(f"Original cast:     {rays / legacy_time:10.0f} rays/s")
+    print(f"8px march (numpy): {rays / march_time:10.0f} rays/s")
+    print(f"Sphere trace:      {rays / trace_time:10.0f} rays/s ({legacy_time / trace_time:.1f}x original)")
+    print(f"Vectorized grid:   {rays / grid_time:10.0f} rays/s ({legacy_time / grid_time:.1f}x original)")
+    grid_match = np.mean([np.array_equal(march(p), grid(p)) for p in poses])
+    print(f"Grid == 8px march: {grid_match:.1%} of {len(poses)} poses")
+    print(f"Parity (-1 < march - trace < 8px): {agree:.1%} of {len(deltas)} rays, "
+          f"max |delta| {np.abs(deltas).max():.1f}px")
+
+    # Multi-car: N single-car casts vs one cast_batch call
+    print("Cars  per-car loop   cast_batch   (rays/s)")
+    for n in (1, 2, 8, 64):
+        batch = poses[:n]
+        positions = np.array([(x, y) for x, y, _ in batch])
+        angles = np.array([a for _, _, a in batch])
+        loop_time = time_caster(lambda _: [grid(p) for p in batch], [None], repeat=20)
+        batch_time = time_caster(lambda _: caster.cast_batch(field, positions, angles, boxes), [None], repeat=20)
+        same = np.array_equal(np.array([grid(p) for p in batch]),
+                              caster.cast_batch(field, positions, angles, boxes)[0])
+        n_rays = n * len(car.ray_angles)
+        print(f"{n:4d}  {n_rays / loop_time:12.0f}  {n_rays / batch_time:11.0f}   {'ok' if same else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
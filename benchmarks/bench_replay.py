@@ -0,0 +1,88 @@
+# bench_replay.py - add/sample latency and memory of the replay buffer
+# Run from the repository root: python -m benchmarks.bench_replay
+import random
+import time
+import tracemalloc
+from collections import deque
+
+import numpy as np
+
+from scripts.replaybuffer import ReplayBuffer
+
+STATE_DIM = 14
+
+
+class LegacyReplayBuffer:
+    """The deque-of-tuples buffer the ring buffer replaced"""
+    def __init__(self, capacity=10000):
+        self.buffer = deque(maxlen=capacity)
+
+    def add(self, state, action, reward, next_state, done):
+        self.buffer.append((state, action, reward, next_state, done))
+
+    def sample(self, batch_size):
+        indices = random.sample(range(len(self.buffer)), batch_size)
+        batch = [self.buffer[i] for i in indices]
+        states = np.vstack([exp[0] for exp in batch])
+        actions = np.array([exp[1] for exp in batch], dtype=np.int64)
+        rewards = np.array([exp[2] for exp in batch], dtype=np.float32)
+        next_states = np.vstack([exp[3] for exp in batch])
+        dones = np.array([exp[4] for exp in batch], dtype=np.float32)
+        return states, actions, rewards, next_states, dones
+
+    def __len__(self):
+        return len(self.buffer)
+
+
+def transitions(count, seed=0):
+    """Transitions shaped like the trainer's: states are lists of 14 floats"""
+    rng = random.Random(seed)
+    state = [rng.random() for _ in range(STATE_DIM)]
+    for _ in range(count):
+        next_state = [rng.random() for _ in range(STATE_DIM)]
+        yield state, rng.randrange(6), rng.uniform(-2, 2), next_state, rng.random() < 0.01
+        state = next_state
+
+
+def held_memory(make, capacity):
+    """Bytes still allocated after building a buffer and filling it to capacity"""
+    tracemalloc.start()
+    buffer = make()
+    for t in transitions(capacity):
+        buffer.add(*t)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return held
+
+
+def time_sample(buffer, batch_size, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        buffer.sample(batch_size)
+    return (time.perf_counter() - start) / repeat
+
+
+def main(capacity=100000, batch_size=128, repeat=2000):
+    # tracemalloc slows every allocation, so add latency is measured on a separate fill
+    results = {}
+    for name, make in (("deque", lambda: LegacyReplayBuffer(capacity)),
+                       ("ring", lambda: ReplayBuffer(capacity, STATE_DIM))):
+        memory = held_memory(make, capacity)
+        buffer = make()
+        data = list(transitions(capacity))
+        start = time.perf_counter()
+        for t in data:
+            buffer.add(*t)
+        add = (time.perf_counter() - start) / capacity
+        results[name] = (add, time_sample(buffer, batch_size, repeat), memory)
+
+    print(f"Replay buffer, capacity {capacity}, batch {batch_size}")
+    print(f"{'':6} {'add (us)':>9} {'sample (us)':>12} {'memory (MB)':>12}")
+    for name, (add, sample, memory) in results.items():
+        print(f"{name:6} {add * 1e6:9.2f} {sample * 1e6:12.1f} {memory / 2**20:12.1f}")
+    old, new = results["deque"], results["ring"]
+    print(f"sample {old[1] / new[1]:.1f}x faster, memory {old[2] / new[2]:.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
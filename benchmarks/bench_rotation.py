@@ -0,0 +1,59 @@
+# bench_rotation.py - per-step cost of Car.rotate with and without the sprite cache
+# Run from the repository root: python -m benchmarks.bench_rotation
+import os
+import random
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+from scripts.Constants import *
+from scripts.Car import Car
+
+
+def uncached_rotate(car, left=False, right=False):
+    """The pre-cache Car.rotate: transform.rotate + mask.from_surface every turning step"""
+    turn = (1 if left else 0) - (1 if right else 0)
+    car.angle += turn * car.rotation_velocity * (0.4 + 0.6 * (abs(car.velocity) / car.max_velocity))
+    car.image = pygame.transform.rotate(car.original_image, car.angle)
+    old_center = car.rect.center
+    car.rect = car.image.get_rect()
+    car.rect.center = old_center
+    car.mask = pygame.mask.from_surface(car.image)
+
+
+def time_turns(rotate, car, turns):
+    start = time.perf_counter()
+    for left in turns:
+        rotate(car, left=left, right=not left)
+    return time.perf_counter() - start
+
+
+def main(num_steps=20000):
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    rng = random.Random(0)
+    turns = [rng.random() < 0.5 for _ in range(num_steps)]
+
+    car = Car(*CAR_START_POS)
+    car.velocity = car.max_velocity * 0.7
+    uncached = time_turns(uncached_rotate, car, turns)
+
+    Car._rotation_cache.clear()
+    car.reset(*CAR_START_POS)
+    car.velocity = car.max_velocity * 0.7
+    start = time.perf_counter()
+    for bucket in range(round(360 / ROTATION_STEP)):
+        car.angle = bucket * ROTATION_STEP
+        car._rotated_sprite()
+    warmup = time.perf_counter() - start
+    cached = time_turns(Car.rotate, car, turns)
+
+    print(f"Cache fill ({round(360 / ROTATION_STEP)} buckets): {warmup * 1000:8.1f} ms")
+    print(f"Uncached rotate:  {uncached / num_steps * 1e6:8.2f} us/step")
+    print(f"Cached rotate:    {cached / num_steps * 1e6:8.2f} us/step ({uncached / cached:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
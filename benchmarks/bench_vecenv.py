@@ -0,0 +1,59 @@
+# bench_vecenv.py - env-steps/second of VecAIEnvironment vs N HeadlessAIEnvironments
+# Run from the repository root: python -m benchmarks.bench_vecenv
+import contextlib
+import io
+import random
+import time
+
+import numpy as np
+
+from scripts.simcore import HeadlessAIEnvironment, load_track
+from scripts.vecenv import VecAIEnvironment
+
+ACTIONS = [0, 1, 3, 4, 5, 6]  # DQNAgent.ACTION_MAP
+PROBS = [0.05, 0.5, 0.1, 0.1, 0.125, 0.125]
+
+
+def time_headless(track, num_envs, num_steps, rng):
+    """N single-car environments stepped in a Python loop"""
+    envs = [HeadlessAIEnvironment(track=track) for _ in range(num_envs)]
+    for env in envs:
+        env.reset()
+        env.get_state()
+    actions = rng.choice(ACTIONS, size=(num_steps, num_envs), p=PROBS).tolist()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for step_actions in actions:
+            for env, action in zip(envs, step_actions):
+                _, _, done = env.step(action)
+                if done:
+                    env.reset()
+                    env.get_state()
+    return time.perf_counter() - start
+
+
+def time_vec(track, num_envs, num_steps, rng):
+    """One VecAIEnvironment with N cars"""
+    env = VecAIEnvironment(num_envs, track=track)
+    actions = rng.choice(ACTIONS, size=(num_steps, num_envs), p=PROBS)
+    start = time.perf_counter()
+    for step_actions in actions:
+        env.step(step_actions)
+    return time.perf_counter() - start
+
+
+def main(sizes=(1, 4, 16, 64), num_steps=300):
+    random.seed(0)
+    rng = np.random.default_rng(0)
+    track = load_track()
+
+    print(f"{'envs':>5} {'headless steps/s':>17} {'vec steps/s':>12} {'speedup':>8}")
+    for n in sizes:
+        headless = time_headless(track, n, num_steps, rng)
+        vec = time_vec(track, n, num_steps, rng)
+        total = n * num_steps
+        print(f"{n:5d} {total / headless:17.0f} {total / vec:12.0f} {headless / vec:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,474 @@
+# suite.py - fixed-seed micro and macro benchmarks with JSON output and baseline comparison
+# Run from the repository root: python -m benchmarks.suite [--quick] [--only NAME ...]
+#                                   [--out FILE] [--baseline FILE] [--save-baseline]
+# Metrics ending in _per_sec are higher-is-better, all others (_ms, _us, _bytes) lower-is-better.
+# Results go to benchmarks/results/latest.json; --save-baseline also stores them as
+# benchmarks/results/baseline.json, which later runs are compared against by default.
+# Metrics listed in ALLOC_BUDGETS fail the run (exit 1) when over budget, baseline or not.
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import torch
+
+from scripts.SimConstants import *
+from scripts.checkpoint import CheckpointManager
+from scripts.dqn import DQN, NumpyDQN
+from scripts.dqn_agent import DQNAgent
+from scripts.raycast import RayCaster
+from scripts.replaybuffer import ReplayBuffer, PrioritizedReplayBuffer
+from scripts.rewards import calculate_reward
+from scripts.simcore import HeadlessAIEnvironment, load_track, mask_overlaps, OBSTACLE_HALF_SIZE
+from scripts.vecenv import VecAIEnvironment
+
+STATE_DIM = 14
+ACTIONS = DQNAgent.ACTION_MAP
+PROBS = [0.05, 0.5, 0.1, 0.1, 0.125, 0.125]  # random policy, mostly forward
+RESULTS_DIR = os.path.join("benchmarks", "results")
+BASELINE = os.path.join(RESULTS_DIR, "baseline.json")
+
+# Allocation budgets (bytes) of the observe -> act -> store path, from tracemalloc.
+# *_peak: temporaries live at once during one call of each phase. Interpreter objects
+# (iterators, the argmax scalar) fit; a ufunc cast buffer or an extra array held alongside
+# them does not. NumPy reusing its small cached buffers is invisible to tracemalloc, so these
+# bound memory per call, not the number of allocations.
+# retained: still allocated after >= 1000 traced steps, so anything kept per step exceeds it.
+ALLOC_BUDGETS = {
+    'observation.observe_peak_alloc_bytes': 192,
+    'observation.act_peak_alloc_bytes': 400,
+    'observation.store_peak_alloc_bytes': 192,
+    'observation.retained_alloc_bytes': 512,
+}
+
+
+def best_time(fn, repeat):
+    """Best-of-repeat seconds for one call of fn"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def quiet(fn, *args, **kwargs):
+    """Call fn with stdout swallowed (agents and checkpoints print progress)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def seed_all(seed=0):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    return np.random.default_rng(seed)
+
+
+def sample_poses(rng, count):
+    """Car poses spread across the checkpoint lines"""
+    zones = np.array(TRACK_CHECKPOINT_ZONES, dtype=np.float64)
+    picks = zones[rng.integers(0, len(zones), count)]
+    t = rng.uniform(0.2, 0.8, (count, 1))
+    positions = picks[:, 0] + (picks[:, 1] - picks[:, 0]) * t
+    return positions, rng.uniform(0, 360, count)
+
+
+def obstacle_boxes(positions):
+    half = OBSTACLE_HALF_SIZE
+    return np.array([(x - half, y - half, x + half, y + half) for x, y in positions], dtype=np.float64)
+
+
+def filled_buffer(buffer_class, capacity, rng):
+    buffer = buffer_class(capacity, STATE_DIM)
+    buffer.add_batch(
+        rng.random((capacity, STATE_DIM), dtype=np.float32), rng.integers(0, len(ACTIONS), capacity),
+        rng.standard_normal(capacity, dtype=np.float32), rng.random((capacity, STATE_DIM), dtype=np.float32),
+        rng.random(capacity) < 0.01)
+    return buffer
+
+
+# ============================================================================
+# MICRO
+# ============================================================================
+
+def bench_rays(quick):
+    """RayCaster.cast for one car and cast_batch for 64 cars"""
+    rng = seed_all()
+    track = load_track()
+    caster = RayCaster(RAY_ANGLES, RAY_LENGTH)
+    boxes = obstacle_boxes(random.sample(BOMB_LIST, 15))
+    positions, angles = sample_poses(rng, 100 if quick else 500)
+
+    def single():
+        for position, angle in zip(positions, angles):
+            caster.cast(track.field, position, angle, boxes)
+
+    batch = np.broadcast_to(boxes, (64,) + boxes.shape)
+    batch_repeat = 5 if quick else 20
+
+    def batched():
+        for _ in range(batch_repeat):
+            caster.cast_batch(track.field, positions[:64], angles[:64], batch)
+
+    rays = len(RAY_ANGLES)
+    return {
+        'single_rays_per_sec': rays * len(positions) / best_time(single, 3),
+        'batch64_rays_per_sec': rays * 64 * batch_repeat / best_time(batched, 3),
+    }
+
+
+def bench_masks(quick):
+    """Car mask vs track border overlap tests (the per-step collision check)"""
+    rng = seed_all()
+    track = load_track()
+    positions, angles = sample_poses(rng, 200 if quick else 1000)
+    buckets = np.round(angles / ROTATION_STEP).astype(int) % track.buckets
+    tests = []
+    for (x, y), b in zip(positions, buckets):
+        w, h = track.car_sizes[b]
+        tests.append((track.car_masks[b][:w, :h], (int(round(x)) - w // 2, int(round(y)) - h // 2)))
+
+    def overlap():
+        for mask, offset in tests:
+            mask_overlaps(track.field.occupancy, mask, offset)
+
+    return {'border_tests_per_sec': len(tests) / best_time(overlap, 3)}
+
+
+def bench_checkpoints(quick):
+    """CheckpointManager.check_crossing along a lap of checkpoint centres"""
+    seed_all()
+    zones = np.array(TRACK_CHECKPOINT_ZONES, dtype=np.float64)
+    centres = zones.mean(axis=1)
+    # 60 points between consecutive centres, about one per frame at racing speed
+    path = [tuple(a + (b - a) * t) for a, b in zip(centres, np.roll(centres, -1, axis=0))
+            for t in np.linspace(0, 1, 60, endpoint=False)]
+    laps = 2 if quick else 10
+    manager = CheckpointManager()
+
+    def lap():
+        for _ in range(laps):
+            manager.reset()
+            for position in path:
+                manager.check_crossing(position)
+
+    seconds = quiet(best_time, lap, 3)
+    return {'checks_per_sec': laps * len(path) / seconds}
+
+
+def bench_replay(quick):
+    """Uniform and prioritized batch sampling (batch 128)"""
+    rng = seed_all()
+    capacity = 20000 if quick else 100000
+    repeat = 200 if quick else 2000
+    results = {}
+    for name, buffer_class in (('uniform', ReplayBuffer), ('prioritized', PrioritizedReplayBuffer)):
+        buffer = filled_buffer(buffer_class, capacity, rng)
+        seconds = best_time(lambda: [buffer.sample(128) for _ in range(repeat)], 3)
+        results[f'{name}_samples_per_sec'] = repeat / seconds
+    return results
+
+
+def bench_update(quick):
+    """DQNAgent.update on a full buffer (CPU): eager and TorchScript / fused learner step"""
+    results = {}
+    for name, compiled in (('updates_per_sec', False), ('compiled_updates_per_sec', True)):
+        rng = seed_all()
+        agent = quiet(DQNAgent, STATE_DIM, device=torch.device('cpu'), compiled=compiled)
+        agent.replay_buffer = filled_buffer(ReplayBuffer, 20000, rng)
+        updates = 50 if quick else 300
+        for _ in range(3):
+            agent.update()  # warm-up: optimizer state, TorchScript profiling runs
+
+        def run():
+            for _ in range(updates):
+                agent.update()
+
+        results[name] = updates / best_time(run, 3)
+    return results
+
+
+def bench_inference(quick):
+    """Greedy action selection: torch policy_net vs the NumPy mirror, one state and a batch of 64"""
+    rng = seed_all()
+    net = DQN(STATE_DIM, len(ACTIONS), device=torch.device('cpu'))
+    net.eval()
+    mirror = NumpyDQN(net)
+    states = rng.random((64, STATE_DIM), dtype=np.float32)
+    state = states[0].tolist()  # environments hand the agent a list
+    calls = 500 if quick else 5000
+
+    def torch_single():
+        for _ in range(calls):
+            with torch.no_grad():
+                torch.argmax(net(torch.FloatTensor(state).unsqueeze(0))).item()
+
+    def torch_batch():
+        for _ in range(calls // 10):
+            with torch.no_grad():
+                net(torch.from_numpy(states)).argmax(dim=1).numpy()
+
+    def numpy_single():
+        for _ in range(calls):
+            mirror.greedy(state)
+
+    def numpy_batch():
+        for _ in range(calls // 10):
+            mirror.greedy(states)
+
+    return {
+        'torch_single_us': best_time(torch_single, 3) / calls * 1e6,
+        'numpy_single_us': best_time(numpy_single, 3) / calls * 1e6,
+        'torch_batch64_us': best_time(torch_batch, 3) / (calls // 10) * 1e6,
+        'numpy_batch64_us': best_time(numpy_batch, 3) / (calls // 10) * 1e6,
+    }
+
+
+def bench_observation(quick):
+    """Observation write -> action -> replay slot, timed and traced for allocations (tracemalloc)"""
+    seed_all()
+    env = HeadlessAIEnvironment(track=load_track())
+    env.reset()
+    env.get_state()
+    agent = quiet(DQNAgent, STATE_DIM, device=torch.device('cpu'), numpy_inference=True)
+    car, observations = env.car, env.observations
+    steps = 1000 if quick else 10000
+
+    def run():
+        state = car.observe(observations)
+        for _ in range(steps):
+            next_state = car.observe(observations)
+            action = agent.get_action(next_state, training=False)
+            agent.store_experience(state, action, 0.0, next_state, False)
+            state = next_state
+
+    run()  # warm-up
+    seconds = best_time(run, 3)
+    tracemalloc.start()
+    run()
+    retained = tracemalloc.get_traced_memory()[0]
+
+    # Peaks per phase: a whole step's peak hides any temporary smaller than another phase's
+    state = next_state = car.observe(observations)
+    action = agent.get_action(state, training=False)
+    phases = {
+        'observe': lambda: car.observe(observations),
+        'act': lambda: agent.get_action(next_state, training=False),
+        'store': lambda: agent.store_experience(state, action, 0.0, next_state, False),
+    }
+    results = {'observe_act_store_per_sec': steps / seconds}
+    for name, phase in phases.items():
+        peak = 0
+        for _ in range(steps // 10):
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            phase()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+        results[f'{name}_peak_alloc_bytes'] = peak
+    tracemalloc.stop()
+    results['retained_alloc_bytes'] = retained  # still allocated after the loop (grows with steps if leaking)
+    return results
+
+
+# ============================================================================
+# MACRO
+# ============================================================================
+
+def bench_env(quick):
+    """Random-policy env steps: one HeadlessAIEnvironment and a 64-car VecAIEnvironment"""
+    rng = seed_all()
+    track = load_track()
+    steps = 1000 if quick else 5000
+
+    env = HeadlessAIEnvironment(track=track, reward_fn=calculate_reward)
+    env.reset()
+    env.get_state()
+    actions = rng.choice(ACTIONS, size=steps, p=PROBS).tolist()
+
+    def headless():
+        for action in actions:
+            if env.step(action)[2]:
+                env.reset()
+
+    headless_time = quiet(best_time, headless, 1)
+
+    vec = VecAIEnvironment(64, track=track)
+    vec_steps = steps // 20
+    vec_actions = rng.choice(ACTIONS, size=(vec_steps, 64), p=PROBS)
+    vec_time = best_time(lambda: [vec.step(a) for a in vec_actions], 1)
+    return {
+        'headless_steps_per_sec': steps / headless_time,
+        'vec64_steps_per_sec': 64 * vec_steps / vec_time,
+    }
+
+
+def bench_training(quick):
+    """Full single-env training steps: act, env step, store, train"""
+    seed_all()
+    agent = quiet(DQNAgent, STATE_DIM, device=torch.device('cpu'), learning_starts=256)
+    env = HeadlessAIEnvironment(track=load_track(), reward_fn=calculate_reward)
+    env.reset()
+    state = env.get_state()
+    steps = 300 if quick else 2000
+
+    def train():
+        nonlocal state
+        for _ in range(steps):
+            action = agent.get_action(state, training=True)
+            next_state, step_info, done = env.step(action)
+            agent.store_experience(state, action, step_info['reward'], next_state, done)
+            agent.train()
+            state = next_state
+            if done:
+                env.reset()
+                state = env.get_state()
+
+    quiet(train)  # fill past learning_starts so every timed step updates
+    return {'train_steps_per_sec': steps / quiet(best_time, train, 1)}
+
+
+def bench_checkpoint(quick):
+    """DQNAgent.save_model (blocking) and load_model with a full replay buffer"""
+    rng = seed_all()
+    agent = quiet(DQNAgent, STATE_DIM, device=torch.device('cpu'))
+    capacity = 20000 if quick else 100000
+    agent.replay_buffer.add_batch(
+        rng.random((capacity, STATE_DIM), dtype=np.float32), rng.integers(0, len(ACTIONS), capacity),
+        rng.standard_normal(capacity, dtype=np.float32), rng.random((capacity, STATE_DIM), dtype=np.float32),
+        rng.random(capacity) < 0.01)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "model.pt")
+        agent.model_path = path
+        save = quiet(best_time, lambda: agent.save_model(path, wait=True), 3)
+        loaded = quiet(DQNAgent, STATE_DIM, device=torch.device('cpu'))
+        load = quiet(best_time, lambda: loaded.load_model(path), 3)
+        del loaded  # release the memory map before the directory goes
+    return {'save_ms': save * 1000, 'load_ms': load * 1000}
+
+
+BENCHMARKS = {
+    'rays': bench_rays,
+    'masks': bench_masks,
+    'checkpoints': bench_checkpoints,
+    'replay': bench_replay,
+    'update': bench_update,
+    'inference': bench_inference,
+    'observation': bench_observation,
+    'env': bench_env,
+    'training': bench_training,
+    'checkpoint_io': bench_checkpoint,
+}
+
+
+# ============================================================================
+# RESULTS
+# ============================================================================
+
+def environment_info():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'torch': torch.__version__,
+        'torch_threads': torch.get_num_threads(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Print metric / baseline ratios; returns the metrics that got worse than tolerance"""
+    regressions = []
+    print(f"\n{'metric':42s} {'baseline':>12s} {'current':>12s} {'change':>8s}")
+    for bench, metrics in results.items():
+        for metric, value in metrics.items():
+            old = baseline.get(bench, {}).get(metric)
+            name = f"{bench}.{metric}"
+            if not old or not value:
+                print(f"{name:42s} {old or '-':>12} {value:12.1f}")
+                continue
+            # Positive change = better, whichever direction the metric runs
+            change = value / old - 1 if metric.endswith('_per_sec') else old / value - 1
+            flag = ""
+            if change < -tolerance:
+                regressions.append(name)
+                flag = "  REGRESSION"
+            print(f"{name:42s} {old:12.1f} {value:12.1f} {change:+7.1%}{flag}")
+    return regressions
+
+
+def over_budget(results):
+    """Print and return the ALLOC_BUDGETS metrics that exceed their budget"""
+    failures = []
+    for name, budget in ALLOC_BUDGETS.items():
+        bench, metric = name.split('.')
+        value = results.get(bench, {}).get(metric)
+        if value is not None and value > budget:
+            failures.append(name)
+            print(f"{name} = {value:,.0f} exceeds its budget of {budget:,} bytes")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Race-Game benchmark suite")
+    parser.add_argument('--quick', action='store_true', help="smaller workloads (smoke run, noisier numbers)")
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help="run a subset")
+    parser.add_argument('--out', default=os.path.join(RESULTS_DIR, "latest.json"))
+    parser.add_argument('--baseline', default=BASELINE, help="results file to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help=f"also store this run as {BASELINE}")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.only or BENCHMARKS:
+        start = time.perf_counter()
+        results[name] = BENCHMARKS[name](args.quick)
+        metrics = ", ".join(f"{k} {v:,.1f}" for k, v in results[name].items())
+        print(f"{name:14s} {metrics}  ({time.perf_counter() - start:.1f}s)")
+
+    report = {'environment': environment_info(), 'quick': args.quick, 'results': results}
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.out}")
+    if over_budget(results):
+        return 1
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(BASELINE), exist_ok=True)
+        with open(BASELINE, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline stored in {BASELINE}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('quick') != args.quick:
+            print("(baseline was recorded with a different --quick setting)")
+        regressions = compare(results, baseline['results'], args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
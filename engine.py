@@ -6,6 +6,7 @@ from scripts.menu import MainMenu, SettingsMenu
 from scripts.Game import Game
 from scripts.trainer import Trainer  # Use simplified trainer
 from scripts.GameManager import game_state_manager
+from scripts.Car import Car
 
 def main():
     pygame.init()
@@ -42,7 +43,7 @@ def main():
             game.run(dt)
         
         elif current_state == 'training':
-            # Training runs uncapped (as fast as possible when viz off)
+            # One training step per frame (capped by the clock above); train.py runs uncapped
             trainer.run(dt)
         
         else:
@@ -56,6 +57,7 @@ def main():
             if event.type == pygame.QUIT:
                 running = False
     
+    Car.report_parity()
     pygame.quit()
     sys.exit()
 
@@ -0,0 +1,194 @@
+# export_policy.py - compact policy export for in-game AI opponents, with an agreement report
+# Run from the repository root:
+#   python export_policy.py [--checkpoint models/actions_6/best_model.pt] [--out FILE]
+#                           [--int8] [--distill 64,32,16] [--replay models/actions_6/model_replay]
+#                           [--seeds 20]
+# --int8 stores the linear weights as int8 (per-row scales, ~4x smaller file);
+# --distill trains a narrower student on the teacher's Q-values over replayed
+# states (the replay buffer, or teacher rollouts when there is none), which is
+# what cuts per-decision CPU time. The report compares the exported file, as
+# DQNPolicy.load reads it back, against the teacher: argmax agreement on
+# held-out states and head-to-head races over fixed obstacle seeds.
+import argparse
+import os
+import random
+import sys
+import time
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export a compact DQN policy for gameplay")
+    parser.add_argument('--checkpoint', default=os.path.join("models", "actions_6", "best_model.pt"),
+                        help="trained checkpoint (full or slim policy file)")
+    parser.add_argument('--out', default=None, help="output file (default <checkpoint>_compact.pt)")
+    parser.add_argument('--int8', action='store_true', help="store int8 linear weights")
+    parser.add_argument('--distill', default=None, metavar='H1,H2,H3',
+                        help="hidden sizes of a distilled student network, e.g. 64,32,16")
+    parser.add_argument('--replay', default=None,
+                        help="replay buffer directory to take states from (default <checkpoint dir>/model_replay)")
+    parser.add_argument('--states', type=int, default=50000, help="states used for distillation and agreement")
+    parser.add_argument('--epochs', type=int, default=30, help="distillation epochs")
+    parser.add_argument('--seeds', type=int, default=20, help="evaluation races per policy")
+    return parser.parse_args(argv)
+
+
+def replay_states(replay_dir, count, rng):
+    """Up to count states sampled from a saved replay buffer"""
+    import numpy as np
+    from scripts.replaybuffer import ReplayBuffer
+
+    buffer = ReplayBuffer.load(replay_dir, mmap_mode='r')
+    indices = rng.choice(len(buffer), size=min(count, len(buffer)), replace=False)
+    return np.asarray(buffer.states[np.sort(indices)], dtype=np.float32)
+
+
+def rollout_states(policy, count, track, epsilon=0.1):
+    """States visited by the teacher acting epsilon-greedily"""
+    import numpy as np
+    from scripts.simcore import HeadlessAIEnvironment
+
+    env = HeadlessAIEnvironment(track=track)
+    saved_epsilon, policy.epsilon = policy.epsilon, epsilon
+    states = []
+    env.reset()
+    state = env.get_state()
+    while len(states) < count:
+        states.append(state.copy())  # env states are reused arrays
+        state, _, done = env.step(policy.act(state))
+        if done:
+            env.reset()
+            state = env.get_state()
+    policy.epsilon = saved_epsilon
+    return np.asarray(states, dtype=np.float32)
+
+
+def distill(teacher, states, hidden, epochs, batch_size=256):
+    """Student DQNPolicy fit to the teacher's Q-values (MSE) on states"""
+    import torch
+    import torch.nn.functional as F
+    from scripts.policy import DQNPolicy
+
+    student = DQNPolicy(teacher.state_dim, teacher.action_dim, action_map=teacher.action_map.tolist(),
+                        hidden=hidden)
+    inputs = torch.from_numpy(states)
+    with torch.no_grad():
+        targets = teacher.net(inputs)
+    # Fit standardized Q-values, then fold the scale back into the output layer
+    mean, std = targets.mean(), targets.std().clamp(min=1e-6)
+    targets = (targets - mean) / std
+
+    net = student.net
+    net.train()
+    optimizer = torch.optim.Adam(net.parameters(), lr=1e-3)
+    for epoch in range(epochs):
+        order = torch.randperm(len(inputs))
+        total = 0.0
+        for start in range(0, len(inputs), batch_size):
+            batch = order[start:start + batch_size]
+            loss = F.mse_loss(net(inputs[batch]), targets[batch])
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total += loss.item() * len(batch)
+        if epoch == 0 or (epoch + 1) % 10 == 0 or epoch == epochs - 1:
+            print(f"  epoch {epoch + 1:3d}/{epochs}: standardized Q MSE {total / len(inputs):.5f}")
+    net.eval()
+    with torch.no_grad():
+        net.fc4.weight.mul_(std)
+        net.fc4.bias.mul_(std).add_(mean)
+    if student.numpy_net is not None:
+        student.numpy_net.refresh(net)
+    return student
+
+
+def race(policy, env, seed):
+    """One greedy episode on the obstacle layout of seed -> (finished, checkpoints, time left)"""
+    random.seed(seed)
+    env.reset()
+    state = env.get_state()
+    done = False
+    while not done:
+        state, _, done = env.step(policy.act(state))
+    finished = env.car_finished
+    return finished, env.checkpoint_manager.crossed_count, env.time_remaining if finished else 0.0
+
+
+def decision_us(policy, states, calls=2000):
+    """Mean microseconds per single-state act()"""
+    rows = [states[i % len(states)].tolist() for i in range(calls)]
+    start = time.perf_counter()
+    for state in rows:
+        policy.act(state)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+    import numpy as np
+    import torch
+    from scripts.policy import DQNPolicy
+    from scripts.simcore import HeadlessAIEnvironment, load_track
+
+    teacher = DQNPolicy.load(args.checkpoint)
+    if teacher is None:
+        return 1
+    print(f"Teacher: {teacher.loaded_from} (hidden {teacher.hidden})")
+
+    out = args.out or f"{os.path.splitext(args.checkpoint)[0]}_compact.pt"
+    rng = np.random.default_rng(0)
+    torch.manual_seed(0)
+    track = load_track()
+
+    # States: replay buffer if one was saved next to the checkpoint, else teacher rollouts
+    replay_dir = args.replay or os.path.join(os.path.dirname(args.checkpoint), "model_replay")
+    if os.path.isdir(replay_dir):
+        states = replay_states(replay_dir, args.states, rng)
+        print(f"States: {len(states)} from {replay_dir}")
+    else:
+        states = rollout_states(teacher, args.states, track)
+        print(f"States: {len(states)} from teacher rollouts (no replay buffer at {replay_dir})")
+    rng.shuffle(states)
+    holdout = max(1, len(states) // 10)
+    train_states, eval_states = states[holdout:], states[:holdout]
+
+    if args.distill:
+        hidden = tuple(int(h) for h in args.distill.split(','))
+        print(f"Distilling into hidden {hidden} on {len(train_states)} states")
+        exported = distill(teacher, train_states, hidden, args.epochs)
+    else:
+        exported = teacher
+    exported.save(out, int8=args.int8)
+
+    # Report on the file as the game will load it
+    compact = DQNPolicy.load(out)
+    match = float(np.mean(compact.act_batch(eval_states) == teacher.act_batch(eval_states)))
+
+    env = HeadlessAIEnvironment(track=track)
+    wins = ties = losses = teacher_finishes = compact_finishes = 0
+    for seed in range(args.seeds):
+        teacher_result = race(teacher, env, seed)
+        compact_result = race(compact, env, seed)
+        teacher_finishes += teacher_result[0]
+        compact_finishes += compact_result[0]
+        if compact_result > teacher_result:
+            wins += 1
+        elif compact_result == teacher_result:
+            ties += 1
+        else:
+            losses += 1
+
+    teacher_size = os.path.getsize(teacher.loaded_from)
+    print(f"\nExported {out}")
+    print(f"  file size:        {os.path.getsize(out) / 1024:8.1f} KB (teacher file {teacher_size / 1024:.1f} KB)")
+    print(f"  decision time:    {decision_us(compact, eval_states):8.1f} us (teacher {decision_us(teacher, eval_states):.1f} us)")
+    print(f"  argmax agreement: {match:8.1%} on {len(eval_states)} held-out states")
+    print(f"  races vs teacher: {wins} won / {ties} tied / {losses} lost over {args.seeds} seeds "
+          f"(win rate {wins / max(args.seeds, 1):.1%})")
+    print(f"  finishes:         {compact_finishes}/{args.seeds} (teacher {teacher_finishes}/{args.seeds})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
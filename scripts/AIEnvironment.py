@@ -1,10 +1,11 @@
 # AIEnvironment.py - FIXED STATE SIZE (20 values)
 import pygame
-import math
 from scripts.Constants import *
 from scripts.Car import Car
-from scripts.Obstacle import Obstacle
+from scripts.Obstacle import Obstacle, ObstacleGroup
+from scripts.raycast import TrackField
 from scripts.checkpoint import CheckpointManager
+from scripts.observation import ObservationBuffer
 
 
 class AIEnvironment:
@@ -13,14 +14,16 @@ class AIEnvironment:
         
         # Car
         self.car = Car(*CAR_START_POS, "Red")
+        self.observations = ObservationBuffer()
         
         # Obstacles
         self.num_obstacles = 15
-        self.obstacle_group = pygame.sprite.Group()
+        self.obstacle_group = ObstacleGroup()
         self._generate_obstacles()
         
         # Track
         self._setup_track()
+        self.obstacle_group.attach(self.track_field)
         
         # Checkpoint manager
         self.checkpoint_manager = CheckpointManager()
@@ -38,6 +41,7 @@ class AIEnvironment:
     def _setup_track(self):
         self.track_border = pygame.image.load(TRACK_BORDER).convert_alpha()
         self.track_border_mask = pygame.mask.from_surface(self.track_border)
+        self.track_field = TrackField.from_mask(self.track_border_mask, key=TRACK_BORDER)
         
         self.finish_line = pygame.transform.scale(
             pygame.image.load(FINISHLINE).convert_alpha(),
@@ -69,32 +73,14 @@ class AIEnvironment:
     
     def get_state(self):
         """
-        State: 14 values total
+        State: 14 float32 values (layout in observation.py)
         - 11 rays (normalized)
         - 1 velocity (normalized)
         - 2 orientation (sin/cos)
+        The array is reused: it is overwritten by the next-but-one get_state().
         """
-        self.car.cast_rays(self.track_border_mask, self.obstacle_group)
-        
-        # 1. Rays (11 values) - normalized
-        normalized_rays = [d / self.car.ray_length for d in self.car.ray_distances]
-        
-        # 2. Velocity (1 value)
-        norm_vel = max(0.0, self.car.velocity / self.car.max_velocity)
-        
-        # 3. Car orientation (2 values - sin/cos to avoid 0/360 discontinuity)
-        angle_rad = math.radians(self.car.angle)
-        angle_sin = math.sin(angle_rad)
-        angle_cos = math.cos(angle_rad)
-        
-        state = [
-            *normalized_rays,  # 0-10 (11 values)
-            norm_vel,          # 11
-            angle_sin,         # 12
-            angle_cos,         # 13
-        ]
-        
-        return state
+        self.car.cast_rays(self.track_field, self.obstacle_group)
+        return self.car.observe(self.observations)
     
     def step(self, action):
         if self.episode_ended:
@@ -139,7 +125,7 @@ class AIEnvironment:
         if not moving: self.car.reduce_speed()
     
     def _check_obstacle(self, pre_velocity):
-        for obstacle in self.obstacle_group.sprites():
+        for obstacle in self.obstacle_group.near(self.car.rect):
             if pygame.sprite.collide_mask(self.car, obstacle):
                 self.car.velocity *= 0.25
                 obstacle.kill()
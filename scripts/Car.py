@@ -1,9 +1,21 @@
 import math
+import warnings
 import pygame
 from pygame.math import Vector2
 from scripts.Constants import *
+import numpy as np
+from scripts.raycast import RayCaster, ray_directions, obstacle_boxes, sphere_trace, parity_check
+
+_batch_caster = RayCaster(RAY_ANGLES, RAY_LENGTH)
+
 
 class Car(pygame.sprite.Sprite):
+    # Rotated sprites shared by every car: {car_color: {angle_bucket: (image, mask)}}
+    _rotation_cache = {}
+    # RAY_PARITY_CHECK tallies over every car, reported by report_parity()
+    parity_rays = 0
+    parity_mismatches = 0
+
     def __init__(self, x, y, car_color="Red"):
         super().__init__()
         self.position = Vector2(x, y)
@@ -28,54 +40,71 @@ class Car(pygame.sprite.Sprite):
         self.can_move = True
 
         # Ray sensors - simplified to single distance list
-        self.ray_length = 400
-        self.ray_angles = [-75, -60, -45, -30, -15, 0, 15, 30, 45, 60, 75]
+        self.ray_length = RAY_LENGTH
+        self.ray_angles = list(RAY_ANGLES)
         self.ray_distances = [self.ray_length] * len(self.ray_angles)
+        self.ray_array = np.full(len(self.ray_angles), float(self.ray_length))  # same distances, as cast
         self.ray_collision_points = [None] * len(self.ray_angles)
-        
-        # Pre-calculate ray directions
-        self.ray_directions = []
-        for angle in self.ray_angles:
-            direction = Vector2(0, -1).rotate(-angle)
-            self.ray_directions.append(direction.normalize())
-
-    def cast_rays(self, border_mask, obstacle_group=None):
-        """Cast rays and store minimum distance (border or obstacle)"""
-        car_rotation = -self.angle
-        step = 8
-        width, height = border_mask.get_size()
-
-        for idx, direction in enumerate(self.ray_directions):
-            ray_dir = direction.rotate(car_rotation)
-            min_dist = self.ray_length
-            
-            for dist in range(step, self.ray_length + 1, step):
-                end_pos = self.position + ray_dir * dist
-                x, y = int(end_pos.x), int(end_pos.y)
-
-                if not (0 <= x < width and 0 <= y < height):
-                    break
-                    
-                # Check border collision
-                if border_mask.get_at((x, y)):
-                    min_dist = dist
-                    break
-                
-                # Check obstacle collision
-                if obstacle_group:
-                    for obstacle in obstacle_group:
-                        if obstacle.rect.collidepoint(x, y):
-                            obs_offset = (x - obstacle.rect.x, y - obstacle.rect.y)
-                            mask_w, mask_h = obstacle.mask.get_size()
-                            if 0 <= obs_offset[0] < mask_w and 0 <= obs_offset[1] < mask_h:
-                                if obstacle.mask.get_at(obs_offset):
-                                    min_dist = dist
-                                    break
-                    if min_dist < self.ray_length:
-                        break
-
-            self.ray_distances[idx] = min_dist
-            self.ray_collision_points[idx] = self.position + ray_dir * min_dist
+        self.ray_caster = RayCaster(self.ray_angles, self.ray_length)
+
+    def cast_rays(self, track, obstacle_group=None):
+        """Cast rays against the compiled track and store minimum distance (border or obstacle)"""
+        origin = (self.position.x, self.position.y)
+        # An ObstacleGroup's bitmap index makes obstacle tests one lookup per sample;
+        # the sphere tracer and the parity check still take explicit boxes
+        index = getattr(obstacle_group, 'index', None)
+        needs_boxes = index is None or RAY_CASTER == "sdf" or RAY_PARITY_CHECK
+        boxes = obstacle_boxes(obstacle_group) if needs_boxes else None
+
+        if RAY_CASTER == "sdf":
+            directions = ray_directions(self.ray_angles, self.angle)
+            distances = sphere_trace(track, origin, directions, self.ray_length, boxes)
+            points = [(origin[0] + dx * d, origin[1] + dy * d) for d, (dx, dy) in zip(distances, directions)]
+            self.ray_array = distances
+        else:
+            if index is not None and index.field is not None and index.field.base is track:
+                # Border and obstacles stamped in one bitmap
+                distances, points = self.ray_caster.cast(index.field, origin, self.angle)
+            else:
+                distances, points = self.ray_caster.cast(track, origin, self.angle, boxes if index is None else index)
+            self.ray_array = distances
+            distances = distances.tolist()
+            points = points.tolist()
+
+        if RAY_PARITY_CHECK:
+            directions = ray_directions(self.ray_angles, self.angle)
+            deltas = parity_check(track, origin, directions, self.ray_length, distances, boxes)
+            mismatches = sum(1 for delta in deltas if not -1 < delta < 8)
+            if mismatches and not Car.parity_mismatches:
+                warnings.warn("RAY PARITY: rays disagree with the 8px march (totals at exit)", RuntimeWarning)
+            Car.parity_rays += len(deltas)
+            Car.parity_mismatches += mismatches
+
+        self.ray_distances = distances
+        self.ray_collision_points = [Vector2(point) for point in points]
+
+    @classmethod
+    def report_parity(cls):
+        """Print the RAY_PARITY_CHECK totals, if the check ran"""
+        if cls.parity_rays:
+            print(f"RAY PARITY: {cls.parity_mismatches}/{cls.parity_rays} rays disagreed with the 8px march "
+                  f"({cls.parity_mismatches / cls.parity_rays:.2%})")
+
+    def observe(self, buffer):
+        """Write the agent observation for the last cast_rays() into buffer (ObservationBuffer)"""
+        return buffer.write(self.ray_array, self.ray_length, self.velocity, self.max_velocity, self.angle)
+
+    @staticmethod
+    def cast_rays_batch(track, positions, angles, obstacle_group=None):
+        """
+        Cast the sensors of N cars in one vectorized pass over the shared
+        track and obstacles. Returns an (N, len(RAY_ANGLES)) distance matrix.
+        """
+        obstacles = getattr(obstacle_group, 'index', None)
+        if obstacles is None:
+            obstacles = obstacle_boxes(obstacle_group)
+        distances, _ = _batch_caster.cast_batch(track, positions, angles, obstacles)
+        return distances
 
     def draw_rays(self, surface):
         """Draw ray sensors"""
@@ -96,13 +125,20 @@ class Car(pygame.sprite.Sprite):
         # smooth steering, scaled by speed
         self.angle += turn * self.rotation_velocity * (0.4 + 0.6 * (abs(self.velocity) / self.max_velocity))
 
-        self.image = pygame.transform.rotate(self.original_image, self.angle)
+        self.image, self.mask = self._rotated_sprite()
         old_center = self.rect.center
         self.rect = self.image.get_rect()
         self.rect.center = old_center
-        # Only regenerate mask when actually rotating
-        if left or right:
-            self.mask = pygame.mask.from_surface(self.image)
+
+    def _rotated_sprite(self):
+        """Rotated (image, mask) for the current angle, cached per color in ROTATION_STEP buckets"""
+        bucket = round(self.angle / ROTATION_STEP) % round(360 / ROTATION_STEP)
+        sprites = Car._rotation_cache.setdefault(self.car_color, {})
+        sprite = sprites.get(bucket)
+        if sprite is None:
+            image = pygame.transform.rotate(self.original_image, bucket * ROTATION_STEP)
+            sprite = sprites[bucket] = (image, pygame.mask.from_surface(image))
+        return sprite
 
     def move(self):
         if not self.can_move:
@@ -137,8 +173,8 @@ class Car(pygame.sprite.Sprite):
         self.angle = 0
         self.failed = False
         self.can_move = True
-        self.image = pygame.transform.rotate(self.original_image, self.angle)
+        self.image, self.mask = self._rotated_sprite()
         self.rect = self.image.get_rect(center=self.position)
-        self.mask = pygame.mask.from_surface(self.image)
         self.ray_distances = [self.ray_length] * len(self.ray_angles)
+        self.ray_array = np.full(len(self.ray_angles), float(self.ray_length))
         self.ray_collision_points = [None] * len(self.ray_angles)
\ No newline at end of file
@@ -1,8 +1,9 @@
 import pygame
-import math
 from scripts.Constants import *
 from scripts.Car import Car
-from scripts.Obstacle import Obstacle
+from scripts.Obstacle import Obstacle, ObstacleGroup
+from scripts.raycast import TrackField
+from scripts.observation import ObservationBuffer
 from scripts.utils import (draw_finished, draw_failed, draw_ui, 
                          draw_countdown, draw_pause_overlay, load_sound)
 from pathlib import Path
@@ -155,6 +156,7 @@ class Environment:
         # Car setup
         self.car1_active = car_color1 is not None
         self.car2_active = car_color2 is not None
+        self.observations = {1: ObservationBuffer(), 2: ObservationBuffer()}  # AI states, written in place
         self.car1_finished = False
         self.car2_finished = False
 
@@ -163,11 +165,12 @@ class Environment:
 
         # Obstacles
         self.num_obstacles = 15
-        self.obstacle_group = pygame.sprite.Group()
+        self.obstacle_group = ObstacleGroup()
         self._generate_obstacles()
 
         # Track
         self._setup_track()
+        self.obstacle_group.attach(self.track_field)
 
         # Timers
         self.car1_time = TARGET_TIME if self.car1_active else 0
@@ -203,6 +206,7 @@ class Environment:
         self.track = pygame.image.load(TRACK).convert_alpha()
         self.track_border = pygame.image.load(TRACK_BORDER).convert_alpha()
         self.track_border_mask = pygame.mask.from_surface(self.track_border)
+        self.track_field = TrackField.from_mask(self.track_border_mask, key=TRACK_BORDER)
 
         self.finish_line = pygame.transform.scale(
             pygame.image.load(FINISHLINE).convert_alpha(),
@@ -381,7 +385,7 @@ class Environment:
 
     def _check_single_car_obstacle(self, car, pre_velocity):
         """Check if a single car hit an obstacle and apply velocity reduction."""
-        for obstacle in self.obstacle_group.sprites():
+        for obstacle in self.obstacle_group.near(car.rect):
             if pygame.sprite.collide_mask(car, obstacle):
                 car.velocity *= 0.25
                 self.obstacle_sound.play()
@@ -537,24 +541,7 @@ class Environment:
         else:
             return None
 
-        car.cast_rays(self.track_border_mask, self.obstacle_group)
+        car.cast_rays(self.track_field, self.obstacle_group)
 
-        # Match AIEnvironment.get_state() exactly - 20 values total
-        normalized_rays = [dist / car.ray_length for dist in car.ray_distances]
-
-        # Normalized velocity
-        norm_vel = max(0.0, car.velocity / car.max_velocity)
-
-        # Car orientation (sin/cos to avoid 0/360 discontinuity)
-        angle_rad = math.radians(car.angle)
-        angle_sin = math.sin(angle_rad)
-        angle_cos = math.cos(angle_rad)
-
-        state = [
-            *normalized_rays,   # 0-16 (17 values)
-            norm_vel,           # 17
-            angle_sin,          # 18 (orientation Y component)
-            angle_cos,          # 19 (orientation X component)
-        ]
-
-        return state
\ No newline at end of file
+        # Same 14 float32 values as AIEnvironment.get_state() (layout in observation.py)
+        return car.observe(self.observations[car_num])
\ No newline at end of file
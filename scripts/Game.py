@@ -2,13 +2,16 @@
 import pygame
 import sys
 from scripts.Environment import Environment
+from scripts.Car import Car
 from scripts.Human_Agent import HumanAgentWASD, HumanAgentArrows
-from scripts.dqn_agent import DQNAgent
+from scripts.policy import DQNPolicy
 from scripts.GameManager import game_state_manager
+from scripts.SimConstants import ACTION_REPEAT
 import os
 
 STATE_DIM = 14
 ACTION_DIM = 6  # 6 actions (no backward) for AI
+MODEL_PATH = os.path.join("models", "actions_6", "model.pt")
 
 
 class Game:
@@ -18,6 +21,8 @@ class Game:
         self.environment = None
         self.player1 = None
         self.player2 = None
+        self.action_repeat = ACTION_REPEAT  # frames an AI decision is held for, as in training
+        self.held_actions = {}  # car_num -> (action, frames left)
 
     def initialize_environment(self, settings=None):
         """Initialize the game environment and players"""
@@ -37,6 +42,7 @@ class Game:
         )
 
         self._setup_players(settings)
+        self.held_actions = {}
         print("Game initialized - Ready to play!")
 
     def _setup_players(self, settings):
@@ -50,20 +56,13 @@ class Game:
             print(f"Player 1: Human (WASD) - {settings['car_color1']} car")
 
         elif player1_type == "DQN":
-            self.player1 = DQNAgent(STATE_DIM, ACTION_DIM)
-
-            # Load trained model
-            if os.path.exists(self.player1.model_path):
-                self.player1.load_model(self.player1.model_path)
-                print(f"Player 1: AI loaded from {self.player1.model_path}")
+            # Policy weights only - no target net, optimizer or replay buffer
+            self.player1 = DQNPolicy.load(MODEL_PATH, state_dim=STATE_DIM)  # greedy
+            if self.player1 is not None:
+                print(f"Player 1: AI loaded from {self.player1.loaded_from}")
             else:
                 print("Warning: No trained model found for Player 1!")
-
-            # INFERENCE MODE
-            self.player1.epsilon = 0.02  # 2% randomness
-            self.player1.policy_net.eval()
-            self.player1.target_net.eval()
-            print(f"Player 1: AI in inference mode (ε={self.player1.epsilon})")
+                self.player1 = DQNPolicy(STATE_DIM, ACTION_DIM)
 
         else:
             self.player1 = None
@@ -76,20 +75,13 @@ class Game:
             print(f"Player 2: Human (Arrows) - {settings['car_color2']} car")
 
         elif player2_type == "DQN":
-            self.player2 = DQNAgent(STATE_DIM, ACTION_DIM)
-
-            # Load trained model
-            if os.path.exists(self.player2.model_path):
-                self.player2.load_model(self.player2.model_path)
-                print(f"Player 2: AI loaded from {self.player2.model_path}")
+            # Policy weights only - no target net, optimizer or replay buffer
+            self.player2 = DQNPolicy.load(MODEL_PATH, state_dim=STATE_DIM)  # greedy
+            if self.player2 is not None:
+                print(f"Player 2: AI loaded from {self.player2.loaded_from}")
             else:
                 print("Warning: No trained model found for Player 2!")
-
-            # INFERENCE MODE
-            self.player2.epsilon = 0.02
-            self.player2.policy_net.eval()
-            self.player2.target_net.eval()
-            print(f"Player 2: AI in inference mode (ε={self.player2.epsilon})")
+                self.player2 = DQNPolicy(STATE_DIM, ACTION_DIM)
 
         else:
             self.player2 = None
@@ -104,6 +96,7 @@ class Game:
         # Handle pygame events
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                Car.report_parity()
                 pygame.quit()
                 sys.exit()
 
@@ -117,6 +110,7 @@ class Game:
                 if event.key == pygame.K_SPACE:
                     if self.environment.game_state in ["finished", "failed"]:
                         self.environment.restart_game()
+                        self.held_actions = {}
 
                 # Pause/unpause
                 elif event.key == pygame.K_ESCAPE:
@@ -144,14 +138,22 @@ class Game:
             return None
 
         # AI Player
-        if isinstance(player, DQNAgent):
+        if isinstance(player, DQNPolicy):
+            # Between decisions repeat the last action without casting the sensors
+            action, frames_left = self.held_actions.get(car_num, (None, 0))
+            if frames_left > 0:
+                self.held_actions[car_num] = (action, frames_left - 1)
+                return action
+
             state = self.environment.get_state(car_num=car_num)
             if state is None:
                 return 0
             
-            # get_action returns environment action code (0-8)
-            # For 6-action agent: returns one of [0, 1, 3, 4, 5, 6]
-            return player.get_action(state, training=False)
+            # act returns environment action code (0-8)
+            # For 6-action policy: returns one of [0, 1, 3, 4, 5, 6]
+            action = player.act(state)
+            self.held_actions[car_num] = (action, self.action_repeat - 1)
+            return action
 
         # Human Player
         else:
@@ -1,5 +1,6 @@
 import pygame
 from scripts.Constants import *
+from scripts.raycast import ObstacleIndex
 import random
 
 class Obstacle(pygame.sprite.Sprite):
@@ -19,6 +20,8 @@ class Obstacle(pygame.sprite.Sprite):
         pygame.draw.rect(self.mask_surface, (255, 255, 255), (5, 5, 10, 10))
         self.mask = pygame.mask.from_surface(self.mask_surface)  
         self.rect = self.image.get_rect(center=(x, y))
+        # Solid part of the mask in screen coordinates (used by ray casting)
+        self.hitbox = self.mask.get_bounding_rects()[0].move(self.rect.topleft)
 
     def generate_obstacles(self, num_obstacles=10):  
         obstacle_group = pygame.sprite.Group()
@@ -31,5 +34,36 @@ class Obstacle(pygame.sprite.Sprite):
         return obstacle_group
 
     def reshuffle_obstacles(self, obstacle_group, num_obstacles):
+        # An ObstacleGroup re-indexes itself as sprites leave and join
         obstacle_group.empty()  
-        obstacle_group.add(self.generate_obstacles(num_obstacles))
\ No newline at end of file
+        obstacle_group.add(self.generate_obstacles(num_obstacles))
+
+
+class ObstacleGroup(pygame.sprite.Group):
+    """
+    Sprite group that keeps an ObstacleIndex of its sprites' hitboxes:
+    added sprites are indexed, kill()ed or removed ones dropped, so ray
+    casts and hit tests look up a bitmap instead of looping over sprites.
+    """
+    def __init__(self, *sprites):
+        self.index = ObstacleIndex(WIDTH, HEIGHT)
+        self._slots = {}
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self._slots[sprite] = self.index.add((sprite.hitbox.left, sprite.hitbox.top,
+                                              sprite.hitbox.right, sprite.hitbox.bottom))
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.index.remove(self._slots.pop(sprite))
+
+    def attach(self, field):
+        """Also keep a composite border + obstacle bitmap of the track field (index.field)"""
+        self.index.attach(field)
+
+    def near(self, rect):
+        """Sprites whose hitbox shows inside rect, in group order"""
+        slots = set(self.index.near(rect.left, rect.top, rect.right, rect.bottom))
+        return [sprite for sprite, slot in self._slots.items() if slot in slots] if slots else []
@@ -0,0 +1,194 @@
+# actors.py - multiprocess experience collection for the trainer
+# K actor processes each step their own HeadlessAIEnvironment with a CPU copy
+# of the policy; the learner (Trainer) owns the replay buffer and optimizer.
+import queue
+import random
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from scripts.SimConstants import *
+from scripts.dqn import DQN, NumpyDQN
+from scripts.dqn_agent import DQNAgent
+from scripts.rewards import calculate_reward
+from scripts.simcore import HeadlessAIEnvironment, load_track
+
+STATE_DIM = 14  # 11 rays + 1 velocity + 2 orientation
+CHUNK_SIZE = 64  # transitions per queue message
+
+
+def _copy_weights(source, target):
+    with torch.no_grad():
+        torch._foreach_copy_(list(target.parameters()), list(source.parameters()))
+
+
+def _actor_main(worker_id, shared_net, version, epsilon, transitions, stop, seed):
+    """Actor process: run episodes and stream transitions back in chunks"""
+    torch.set_num_threads(1)
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+    env = HeadlessAIEnvironment(reward_fn=calculate_reward)
+    policy = NumpyDQN()  # refreshed from shared_net on every weight push
+    local_version = -1
+
+    # One chunk of transitions, filled in place (env states are reused arrays)
+    states = np.empty((CHUNK_SIZE, STATE_DIM), dtype=np.float32)
+    next_states = np.empty((CHUNK_SIZE, STATE_DIM), dtype=np.float32)
+    actions = np.empty(CHUNK_SIZE, dtype=np.int64)
+    rewards = np.empty(CHUNK_SIZE, dtype=np.float32)
+    dones = np.empty(CHUNK_SIZE, dtype=np.float32)
+    count = 0
+    episode_reward = 0.0
+    env.reset()
+    state = env.get_state()
+
+    while not stop.is_set():
+        # Pull new weights when the learner has pushed some
+        if version.value != local_version:
+            with version.get_lock():
+                policy.refresh(shared_net)
+                local_version = version.value
+
+        if random.random() < epsilon.value:
+            agent_action = random.randrange(len(DQNAgent.ACTION_MAP))
+        else:
+            agent_action = policy.greedy(state)
+
+        action = DQNAgent.ACTION_MAP[agent_action]
+        next_state, step_info, done = env.step(action)
+        reward = step_info['reward']
+        states[count] = state
+        actions[count] = action
+        rewards[count] = reward
+        next_states[count] = next_state
+        dones[count] = done
+        count += 1
+        episode_reward += reward
+        state = next_state
+
+        if count >= CHUNK_SIZE or done:
+            # Copies: the queue pickles on a feeder thread, after these arrays are refilled
+            _put(transitions, stop, ('transitions', worker_id, (
+                states[:count].copy(), actions[:count].copy(), rewards[:count].copy(),
+                next_states[:count].copy(), dones[:count].copy())))
+            count = 0
+
+        if done:
+            finished = env.car_finished
+            _put(transitions, stop, ('episode', worker_id, {
+                'reward': episode_reward,
+                'checkpoints': env.checkpoint_manager.crossed_count,
+                'finished': finished,
+                'crashed': env.car_crashed,
+                'time_left': env.time_remaining if finished else 0.0,
+            }))
+            episode_reward = 0.0
+            env.reset()
+            state = env.get_state()
+
+
+def _put(transitions, stop, item):
+    """Blocking put that gives up when the pool is stopping"""
+    while not stop.is_set():
+        try:
+            transitions.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            pass
+
+
+class ActorPool:
+    """
+    Learner side of the actor/learner split.
+    - start(): spawn num_actors processes sharing a CPU copy of policy_net
+    - drain(agent): move queued transitions into agent.replay_buffer, returns finished episode stats
+    - sync(agent): share the learner's epsilon
+    - close(): stop and join the actors
+    Weights are pushed whenever the agent publishes them (every target_update
+    updates and after load_model), through agent.add_weights_listener.
+    """
+    def __init__(self, num_actors=NUM_ACTORS, queue_size=256):
+        self.num_actors = num_actors
+        self.queue_size = queue_size
+        self.processes = []
+        self.transitions_received = 0
+        self._agent = None  # agent whose published weights are pushed to the actors
+
+    def start(self, agent):
+        # Compile the track once here so the actors only load it
+        load_track()
+
+        ctx = mp.get_context('spawn')
+        self.shared_net = DQN(agent.state_dim, agent.action_dim, device=torch.device('cpu'))
+        _copy_weights(agent.policy_net, self.shared_net)
+        self.shared_net.share_memory()
+        self.version = ctx.Value('i', 0)
+        self.epsilon = ctx.Value('d', agent.epsilon)
+        self.transitions = ctx.Queue(maxsize=self.queue_size)
+        self.stop = ctx.Event()
+        agent.add_weights_listener(self._push_weights)
+        self._agent = agent
+
+        seed = random.randrange(2**31)
+        for worker_id in range(self.num_actors):
+            process = ctx.Process(
+                target=_actor_main,
+                args=(worker_id, self.shared_net, self.version, self.epsilon, self.transitions, self.stop, seed + worker_id),
+                daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+        print(f"✓ Started {self.num_actors} actor processes (weight sync every {agent.target_update} updates)")
+
+    def drain(self, agent, max_items=None):
+        """Store every queued transition chunk; returns the list of finished episode stats"""
+        episodes = []
+        items = 0
+        while max_items is None or items < max_items:
+            try:
+                kind, worker_id, payload = self.transitions.get_nowait()
+            except queue.Empty:
+                break
+            items += 1
+            if kind == 'episode':
+                episodes.append(payload)
+                continue
+            # Each actor is one episode stream for the agent's n-step accumulators
+            agent.store_experiences(*payload, streams=[('actor', worker_id)] * len(payload[1]))
+            self.transitions_received += len(payload[1])
+        return episodes
+
+    def _push_weights(self, policy_net):
+        """Weights listener: copy published weights into shared_net for the actors"""
+        with self.version.get_lock():
+            _copy_weights(policy_net, self.shared_net)
+            self.version.value += 1
+
+    def sync(self, agent):
+        """Share the learner's epsilon"""
+        self.epsilon.value = agent.epsilon
+
+    def close(self):
+        if self._agent is not None:
+            self._agent.remove_weights_listener(self._push_weights)
+            self._agent = None
+        if not self.processes:
+            return
+        self.stop.set()
+        # Empty the queue so no actor stays blocked on a full pipe
+        for _ in range(50):
+            try:
+                while True:
+                    self.transitions.get_nowait()
+            except queue.Empty:
+                pass
+            for p in self.processes:
+                p.join(timeout=0.1)
+            if not any(p.is_alive() for p in self.processes):
+                break
+        for p in self.processes:
+            if p.is_alive():
+                p.terminate()
+        self.processes = []
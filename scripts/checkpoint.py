@@ -1,6 +1,5 @@
 # scripts/checkpoint.py
-import pygame
-from scripts.Constants import TRACK_CHECKPOINT_ZONES
+from scripts.SimConstants import TRACK_CHECKPOINT_ZONES
 
 class CheckpointManager:
     """
@@ -81,6 +80,7 @@ class CheckpointManager:
 
     def draw(self, surface):
         """Draw checkpoint zones with center dots and cross counts"""
+        import pygame
         font = pygame.font.Font(None, 18)
         
         for i, (p1, p2) in enumerate(self.zones):
@@ -0,0 +1,78 @@
+# checkpoint_writer.py - writes DQNAgent checkpoints on a background thread
+import os
+import threading
+import torch
+
+
+def cpu_copy(obj):
+    """Deep copy of a (nested) state dict with every tensor detached onto the CPU"""
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to('cpu', copy=True)
+    if isinstance(obj, dict):
+        return {k: cpu_copy(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(cpu_copy(v) for v in obj)
+    return obj
+
+
+class CheckpointWriter:
+    """
+    Single background thread that writes checkpoints.
+    submit() only queues a snapshot; a save requested for a path that is
+    still waiting replaces it (latest wins), so a burst of saves costs one
+    write per path. Every write keeps the .tmp + os.replace semantics.
+    """
+    def __init__(self):
+        self._pending = {}  # path -> (checkpoint, buffer snapshot, buffer dir)
+        self._writing = False
+        self._condition = threading.Condition()
+        self._thread = None
+        self.saves_requested = 0
+        self.saves_written = 0
+
+    def submit(self, path, checkpoint, buffer=None, buffer_dir=None):
+        with self._condition:
+            self._pending[path] = (checkpoint, buffer, buffer_dir)
+            self.saves_requested += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def flush(self):
+        """Block until every submitted checkpoint is on disk"""
+        with self._condition:
+            while self._pending or self._writing:
+                self._condition.wait()
+
+    @property
+    def busy(self):
+        with self._condition:
+            return bool(self._pending) or self._writing
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                path = next(iter(self._pending))
+                checkpoint, buffer, buffer_dir = self._pending.pop(path)
+                self._writing = True
+            try:
+                write_checkpoint(path, checkpoint, buffer, buffer_dir)
+                self.saves_written += 1
+            except Exception as e:
+                print(f"⚠️  Checkpoint save failed ({path}): {e}")
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()
+
+
+def write_checkpoint(path, checkpoint, buffer=None, buffer_dir=None):
+    """Replay buffer first, then the checkpoint that points at it"""
+    if buffer is not None:
+        buffer.save(buffer_dir)
+    tmp = path + '.tmp'
+    torch.save(checkpoint, tmp)
+    os.replace(tmp, path)
@@ -1,23 +1,29 @@
+import warnings
+from typing import Tuple
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 import numpy as np
 
 class DQN(nn.Module):
-    def __init__(self, state_dim, action_dim, device=torch.device('cuda' if torch.cuda.is_available() else 'cpu')):
+    HIDDEN = (256, 128, 64)
+
+    def __init__(self, state_dim, action_dim, device=torch.device('cuda' if torch.cuda.is_available() else 'cpu'),
+                 hidden=HIDDEN):
         super(DQN, self).__init__()
         self.device = device
+        h1, h2, h3 = hidden  # narrower for distilled deployment policies
         
         # Deeper network for better feature learning
-        self.fc1 = nn.Linear(state_dim, 256)      # First layer
-        self.fc2 = nn.Linear(256, 128)            # Second layer  
-        self.fc3 = nn.Linear(128, 64)             # Third layer
-        self.fc4 = nn.Linear(64, action_dim)      # Output layer
+        self.fc1 = nn.Linear(state_dim, h1)       # First layer
+        self.fc2 = nn.Linear(h1, h2)              # Second layer  
+        self.fc3 = nn.Linear(h2, h3)              # Third layer
+        self.fc4 = nn.Linear(h3, action_dim)      # Output layer
         
         # Batch normalization for stability
-        self.bn1 = nn.BatchNorm1d(256)
-        self.bn2 = nn.BatchNorm1d(128)
-        self.bn3 = nn.BatchNorm1d(64)
+        self.bn1 = nn.BatchNorm1d(h1)
+        self.bn2 = nn.BatchNorm1d(h2)
+        self.bn3 = nn.BatchNorm1d(h3)
         
         self.MSELoss = nn.MSELoss()
         
@@ -62,4 +68,122 @@ class DQN(nn.Module):
         Returns:
             torch.Tensor: Q-values
         """
-        return self.forward(x).to(self.device)
\ No newline at end of file
+        return self.forward(x).to(self.device)
+
+class QCore(nn.Module):
+    """
+    DQN.forward without the ndarray check and device moves, so it can be
+    TorchScript-compiled. Shares the linear layers (and parameters) of net.
+    """
+    def __init__(self, net):
+        super(QCore, self).__init__()
+        self.fc1 = net.fc1
+        self.fc2 = net.fc2
+        self.fc3 = net.fc3
+        self.fc4 = net.fc4
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        x = F.leaky_relu(self.fc1(x), negative_slope=0.01)
+        x = F.leaky_relu(self.fc2(x), negative_slope=0.01)
+        x = F.leaky_relu(self.fc3(x), negative_slope=0.01)
+        return self.fc4(x)
+
+
+class FusedTD(nn.Module):
+    """
+    The forward half of a Double DQN update: one policy pass over
+    states ++ next_states (Q of the taken actions and the greedy next
+    actions) and one target pass. Returns (q_values, target_q_values).
+    """
+    def __init__(self, policy_net, target_net):
+        super(FusedTD, self).__init__()
+        self.policy = QCore(policy_net)
+        self.target = QCore(target_net)
+
+    def forward(self, states: torch.Tensor, actions: torch.Tensor, rewards: torch.Tensor,
+                next_states: torch.Tensor, dones: torch.Tensor,
+                discounts: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        batch = states.size(0)
+        q_all = self.policy(torch.cat([states, next_states]))
+        q_values = q_all[:batch].gather(1, actions.unsqueeze(1)).squeeze(1)
+        with torch.no_grad():
+            best_actions = q_all[batch:].argmax(dim=1, keepdim=True)
+            next_q_values = self.target(next_states).gather(1, best_actions).squeeze(1)
+            target_q_values = rewards + (1 - dones) * discounts * next_q_values
+        return q_values, target_q_values.detach()
+
+
+def script(module):
+    """torch.jit.script, without the deprecation warning newer torch prints"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', FutureWarning)
+        return torch.jit.script(module)
+
+
+class NumpyDQN:
+    """
+    Float32 NumPy mirror of a DQN's four linear layers, for CPU action selection.
+    refresh() copies the weights (transposed, contiguous); between refreshes a
+    forward pass is four matmuls with no torch dispatch. Accepts one state
+    (state_dim,) or a batch (N, state_dim).
+    """
+    LAYERS = ('fc1', 'fc2', 'fc3', 'fc4')
+    SLOPE = np.float32(0.01)  # leaky_relu negative slope
+
+    def __init__(self, net=None):
+        self.weights = []
+        self.biases = []
+        self._hidden = []  # preallocated activations (and leaky_relu scratch) for single-state calls
+        self._scratch = []
+        self._output = None
+        if net is not None:
+            self.refresh(net)
+
+    def refresh(self, net):
+        """Copy the current weights of a DQN (or its state_dict); in place when the shapes match"""
+        if isinstance(net, nn.Module):
+            tensors = [(getattr(net, name).weight, getattr(net, name).bias) for name in self.LAYERS]
+        else:
+            tensors = [(net[f'{name}.weight'], net[f'{name}.bias']) for name in self.LAYERS]
+        arrays = [(w.detach().cpu().numpy().T, b.detach().cpu().numpy()) for w, b in tensors]
+
+        if [w.shape for w in self.weights] == [w.shape for w, _ in arrays]:
+            for (w, b), weight, bias in zip(arrays, self.weights, self.biases):
+                np.copyto(weight, w)
+                np.copyto(bias, b)
+            return
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w, _ in arrays]
+        self.biases = [b.astype(np.float32) for _, b in arrays]
+        self._hidden = [np.empty(w.shape[1], dtype=np.float32) for w in self.weights[:-1]]
+        self._scratch = [np.empty(w.shape[1], dtype=np.float32) for w in self.weights[:-1]]
+        self._output = np.empty(self.weights[-1].shape[1], dtype=np.float32)
+
+    def _forward_one(self, x):
+        """Q-values of one float32 state, in the preallocated output array"""
+        for w, b, out, scratch in zip(self.weights, self.biases, self._hidden, self._scratch):
+            np.dot(x, w, out=out)
+            out += b
+            np.multiply(out, self.SLOPE, out=scratch)
+            np.maximum(out, scratch, out=out)  # leaky_relu(0.01)
+            x = out
+        np.dot(x, self.weights[-1], out=self._output)
+        self._output += self.biases[-1]
+        return self._output
+
+    def __call__(self, x):
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == 1:
+            return self._forward_one(x).copy()
+
+        for w, b in zip(self.weights[:-1], self.biases[:-1]):
+            x = x @ w
+            x += b
+            np.maximum(x, x * 0.01, out=x)
+        return x @ self.weights[-1] + self.biases[-1]
+
+    def greedy(self, states):
+        """Argmax agent action(s): int for one state, int array for a batch"""
+        states = np.asarray(states, dtype=np.float32)
+        if states.ndim == 1:
+            return int(self._forward_one(states).argmax())
+        return self(states).argmax(axis=1)
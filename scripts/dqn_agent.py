@@ -5,8 +5,10 @@ import torch.nn.functional as F
 import torch.optim as optim
 import random
 import os
-from scripts.dqn import DQN
-from scripts.replaybuffer import ReplayBuffer
+from scripts.dqn import DQN, NumpyDQN, QCore, FusedTD, script
+from scripts.replaybuffer import ReplayBuffer, PrioritizedReplayBuffer, NStepAccumulator
+from scripts.checkpoint_writer import CheckpointWriter, cpu_copy
+from scripts.policy import policy_export, policy_path
 
 
 class DQNAgent:
@@ -15,7 +17,9 @@ class DQNAgent:
     # Action space: 6 actions (no backward)
     ACTION_MAP = [0, 1, 3, 4, 5, 6]  # coast, forward, left, right, forward+left, forward+right
     
-    def __init__(self, state_dim, action_dim=6, device=None):
+    def __init__(self, state_dim, action_dim=6, device=None, prioritized_replay=False, n_step=1,
+                 train_freq=1, gradient_steps=1, learning_starts=None, numpy_inference=False,
+                 compiled=False, tau=1.0):
         if action_dim != 6:
             raise ValueError("Only 6-action mode supported")
         
@@ -30,6 +34,23 @@ class DQNAgent:
         self.target_net = DQN(state_dim, action_dim, device=self.device).to(self.device)
         self.target_net.load_state_dict(self.policy_net.state_dict())
         self.target_net.eval()
+        self._policy_params = list(self.policy_net.parameters())
+        self._target_params = list(self.target_net.parameters())
+        
+        # Subscribers to published policy weights, called as listener(policy_net)
+        # on every target sync and checkpoint load (see publish_weights)
+        self.weight_listeners = []
+        
+        # Optional TorchScript path: compiled policy forward and fused TD forward (shared parameters)
+        self.compiled = compiled
+        self.policy_forward = script(QCore(self.policy_net)) if compiled else self.policy_net
+        self.fused_td = script(FusedTD(self.policy_net, self.target_net)) if compiled else None
+        
+        # CPU action selection on a NumPy copy of policy_net, refreshed when weights are published
+        # (acting lags the learner by at most target_update updates)
+        self.numpy_policy = NumpyDQN(self.policy_net) if numpy_inference and self.device.type == 'cpu' else None
+        if self.numpy_policy is not None:
+            self.weight_listeners.append(self.numpy_policy.refresh)
         
         # Hyperparameters
         self.gamma = 0.99
@@ -41,8 +62,18 @@ class DQNAgent:
         self.epsilon_min = 0.01
         self.epsilon_decay = 0.9995
         
-        # Target network update frequency
+        # Target network: hard copy every target_update steps (tau=1), or Polyak averaging
+        # with tau every step; either way weights are published every target_update steps
         self.target_update = 100
+        self.tau = tau
+        
+        # Training schedule (see train()): gradient_steps updates every train_freq
+        # env steps, once the buffer holds learning_starts transitions
+        self.train_freq = train_freq
+        self.gradient_steps = gradient_steps
+        self.learning_starts = learning_starts if learning_starts is not None else self.batch_size * 2
+        self.env_steps = 0
+        self._steps_since_update = 0
         
         # Tracking
         self.episode_count = 0
@@ -51,8 +82,14 @@ class DQNAgent:
         self.best_finish_time = 0.0
         self.best_finish_episode = 0
         
-        # Replay buffer
-        self.replay_buffer = ReplayBuffer(capacity=100000)
+        # Replay buffer (prioritized: sampled by TD error, loss weighted by importance sampling)
+        self.prioritized_replay = prioritized_replay
+        buffer_class = PrioritizedReplayBuffer if prioritized_replay else ReplayBuffer
+        self.replay_buffer = buffer_class(capacity=100000, state_dim=state_dim, gamma=self.gamma)
+        
+        # N-step returns: one accumulator per episode stream (env index / actor id)
+        self.n_step = n_step
+        self.accumulators = {}
         
         # Optimizer
         self.optimizer = optim.Adam(self.policy_net.parameters(), lr=self.lr)
@@ -62,6 +99,9 @@ class DQNAgent:
         os.makedirs(self.model_dir, exist_ok=True)
         self.model_path = os.path.join(self.model_dir, "model.pt")
         self.best_model_path = os.path.join(self.model_dir, "best_model.pt")
+        
+        # Checkpoints are written on a background thread
+        self.checkpoint_writer = CheckpointWriter()
     
     def get_action(self, state, training=True):
         """Select action using epsilon-greedy"""
@@ -73,49 +113,126 @@ class DQNAgent:
             agent_action = random.randint(0, self.action_dim - 1)
         else:
             # Greedy action from network
+            if self.numpy_policy is not None:
+                return self.ACTION_MAP[self.numpy_policy.greedy(state)]
             with torch.no_grad():
                 state_tensor = torch.FloatTensor(state).unsqueeze(0).to(self.device)
-                q_values = self.policy_net(state_tensor)
+                q_values = self.policy_forward(state_tensor)
                 agent_action = torch.argmax(q_values).item()
         
         # Map to environment action
         return self.ACTION_MAP[agent_action]
     
-    def store_experience(self, state, env_action, reward, next_state, done):
-        """Store experience in replay buffer"""
+    def get_actions(self, states, training=True):
+        """Epsilon-greedy environment actions for a batch of states (one forward pass)"""
+        states = np.asarray(states, dtype=np.float32)
+        if self.numpy_policy is not None:
+            agent_actions = self.numpy_policy.greedy(states)
+        else:
+            with torch.no_grad():
+                q_values = self.policy_forward(torch.from_numpy(states).to(self.device))
+                agent_actions = q_values.argmax(dim=1).cpu().numpy()
+        
+        # Random exploration, per state
+        if training:
+            explore = np.random.random(len(states)) < self.epsilon
+            agent_actions[explore] = np.random.randint(0, self.action_dim, explore.sum())
+        
+        return np.asarray(self.ACTION_MAP)[agent_actions]
+    
+    def store_experience(self, state, env_action, reward, next_state, done, stream=0):
+        """Store experience in replay buffer (through the n-step accumulator of its stream)"""
         # Convert environment action to agent action index
         try:
             agent_action = self.ACTION_MAP.index(env_action)
         except ValueError:
             agent_action = 0  # default to coast
         
-        self.replay_buffer.add(state, agent_action, reward, next_state, done)
+        if self.n_step == 1:
+            self.replay_buffer.add(state, agent_action, reward, next_state, done)
+            return
+        for transition in self._accumulator(stream).append(state, agent_action, reward, next_state, done):
+            self.replay_buffer.add(*transition)
+    
+    def store_experiences(self, states, env_actions, rewards, next_states, dones, streams=None):
+        """
+        Store N experiences at once (environment actions, leading N axis).
+        streams[i] names the episode stream of row i for n-step returns (default: i).
+        """
+        lookup = np.zeros(max(self.ACTION_MAP) + 1, dtype=np.int64)  # unknown actions -> coast
+        lookup[self.ACTION_MAP] = np.arange(self.action_dim)
+        agent_actions = lookup[np.asarray(env_actions)]
+        
+        if self.n_step == 1:
+            self.replay_buffer.add_batch(states, agent_actions, rewards, next_states, dones)
+            return
+        if streams is None:
+            streams = range(len(agent_actions))
+        for i, stream in enumerate(streams):
+            for transition in self._accumulator(stream).append(
+                    states[i], agent_actions[i], rewards[i], next_states[i], dones[i]):
+                self.replay_buffer.add(*transition)
+    
+    def _accumulator(self, stream):
+        if stream not in self.accumulators:
+            self.accumulators[stream] = NStepAccumulator(self.n_step, self.gamma)
+        return self.accumulators[stream]
+    
+    def train(self, env_steps=1):
+        """
+        Advance the training schedule by env_steps environment steps.
+        Runs gradient_steps updates per train_freq steps that elapsed;
+        returns the mean loss, or None if no update ran.
+        """
+        self.env_steps += env_steps
+        self._steps_since_update += env_steps
+        if self._steps_since_update < self.train_freq:
+            return None
+        
+        updates = self._steps_since_update // self.train_freq * self.gradient_steps
+        self._steps_since_update %= self.train_freq
+        losses = [loss for loss in (self.update() for _ in range(updates)) if loss is not None]
+        return sum(losses) / len(losses) if losses else None
     
     def update(self):
         """Update policy network"""
-        if len(self.replay_buffer) < self.batch_size * 2:
+        if len(self.replay_buffer) < self.learning_starts:
             return None
         
         # Sample batch
-        states, actions, rewards, next_states, dones = self.replay_buffer.sample(self.batch_size)
+        if self.prioritized_replay:
+            states, actions, rewards, next_states, dones, discounts, weights, indices = self.replay_buffer.sample(self.batch_size)
+            weights = torch.from_numpy(weights).to(self.device)
+        else:
+            states, actions, rewards, next_states, dones, discounts = self.replay_buffer.sample(self.batch_size)
+            weights = None
         
         states = torch.FloatTensor(states).to(self.device)
         actions = torch.LongTensor(actions).to(self.device)
         rewards = torch.FloatTensor(rewards).to(self.device)
         next_states = torch.FloatTensor(next_states).to(self.device)
         dones = torch.FloatTensor(dones).to(self.device)
+        discounts = torch.FloatTensor(discounts).to(self.device)  # gamma^n of each transition
         
-        # Current Q-values
-        q_values = self.policy_net(states).gather(1, actions.unsqueeze(1)).squeeze(1)
-        
-        # Target Q-values (Double DQN)
-        with torch.no_grad():
-            best_actions = self.policy_net(next_states).max(1)[1].unsqueeze(1)
-            next_q_values = self.target_net(next_states).gather(1, best_actions).squeeze(1)
-            target_q_values = rewards + (1 - dones) * self.gamma * next_q_values
+        if self.fused_td is not None:
+            # Compiled: one policy pass over states ++ next_states, one target pass
+            q_values, target_q_values = self.fused_td(states, actions, rewards, next_states, dones, discounts)
+        else:
+            # Current Q-values
+            q_values = self.policy_net(states).gather(1, actions.unsqueeze(1)).squeeze(1)
+            
+            # Target Q-values (Double DQN)
+            with torch.no_grad():
+                best_actions = self.policy_net(next_states).max(1)[1].unsqueeze(1)
+                next_q_values = self.target_net(next_states).gather(1, best_actions).squeeze(1)
+                target_q_values = rewards + (1 - dones) * discounts * next_q_values
         
         # Loss
-        loss = F.smooth_l1_loss(q_values, target_q_values)
+        if weights is None:
+            loss = F.smooth_l1_loss(q_values, target_q_values)
+        else:
+            loss = (weights * F.smooth_l1_loss(q_values, target_q_values, reduction='none')).mean()
+            self.replay_buffer.update_priorities(indices, (target_q_values - q_values).detach().cpu().numpy())
         
         # Optimize
         self.optimizer.zero_grad()
@@ -125,14 +242,40 @@ class DQNAgent:
         
         # Update target network
         self.train_step += 1
+        if self.tau < 1.0:
+            self.update_target(self.tau)
         if self.train_step % self.target_update == 0:
-            self.target_net.load_state_dict(self.policy_net.state_dict())
+            if self.tau >= 1.0:
+                self.update_target()
+            self.publish_weights()
         
         # Decay epsilon
         self.epsilon = max(self.epsilon_min, self.epsilon * self.epsilon_decay)
         
         return loss.item()
     
+    def update_target(self, tau=1.0):
+        """In-place target update: copy (tau=1) or target = (1 - tau) * target + tau * policy"""
+        with torch.no_grad():
+            if tau >= 1.0:
+                torch._foreach_copy_(self._target_params, self._policy_params)
+            else:
+                torch._foreach_mul_(self._target_params, 1.0 - tau)
+                torch._foreach_add_(self._target_params, self._policy_params, alpha=tau)
+    
+    def add_weights_listener(self, listener):
+        """Call listener(policy_net) whenever new policy weights are published (once per listener)"""
+        if listener not in self.weight_listeners:
+            self.weight_listeners.append(listener)
+    
+    def remove_weights_listener(self, listener):
+        if listener in self.weight_listeners:
+            self.weight_listeners.remove(listener)
+    
+    def publish_weights(self):
+        for listener in self.weight_listeners:
+            listener(self.policy_net)
+    
     def end_episode(self, episode_reward, checkpoints_reached, time_remaining, finished):
         """Called at end of episode"""
         self.episode_count += 1
@@ -145,28 +288,43 @@ class DQNAgent:
             self.best_finish_episode = self.episode_count
             self.save_model(self.best_model_path)
     
-    def save_model(self, save_path=None):
-        """Save checkpoint"""
+    def save_model(self, save_path=None, save_buffer=None, wait=False):
+        """
+        Save checkpoint (the replay buffer goes to raw arrays in <name>_replay/ next to it,
+        the policy weights alone to <name>_policy.pt).
+        Only the snapshot happens here; the write runs on the checkpoint thread
+        unless wait=True.
+        """
         if save_path is None:
             save_path = self.model_path
+        if save_buffer is None:
+            save_buffer = save_path == self.model_path  # best_model.pt snapshots skip the buffer
+        
+        replay_name = os.path.splitext(os.path.basename(save_path))[0] + '_replay'
+        replay_dir = os.path.join(os.path.dirname(save_path), replay_name)
+        buffer = self.replay_buffer.snapshot(replay_dir) if save_buffer else None
         
         checkpoint = {
-            'model_state_dict': self.policy_net.state_dict(),
-            'target_state_dict': self.target_net.state_dict(),
-            'optimizer_state_dict': self.optimizer.state_dict(),
+            'model_state_dict': cpu_copy(self.policy_net.state_dict()),
+            'target_state_dict': cpu_copy(self.target_net.state_dict()),
+            'optimizer_state_dict': cpu_copy(self.optimizer.state_dict()),
             'epsilon': self.epsilon,
             'train_step': self.train_step,
+            'env_steps': self.env_steps,
             'episode_count': self.episode_count,
             'best_reward': self.best_reward,
             'best_finish_time': self.best_finish_time,
             'best_finish_episode': self.best_finish_episode,
             'action_dim': self.action_dim,
-            'replay_buffer': self.replay_buffer.to_dict(),
+            'replay_buffer_dir': replay_name if save_buffer else None,
         }
         
-        tmp = save_path + '.tmp'
-        torch.save(checkpoint, tmp)
-        os.replace(tmp, save_path)
+        self.checkpoint_writer.submit(save_path, checkpoint, buffer, replay_dir)
+        # Slim copy for gameplay / evaluation (DQNPolicy.load), written after the full checkpoint
+        self.checkpoint_writer.submit(policy_path(save_path), policy_export(
+            checkpoint['model_state_dict'], self.state_dim, self.ACTION_MAP))
+        if wait:
+            self.checkpoint_writer.flush()
     
     def load_model(self, filepath=None):
         """Load checkpoint"""
@@ -189,18 +347,27 @@ class DQNAgent:
         self.policy_net.load_state_dict(checkpoint['model_state_dict'])
         self.target_net.load_state_dict(checkpoint['target_state_dict'])
         self.optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
+        self.publish_weights()
         
         # Load tracking
         self.epsilon = checkpoint.get('epsilon', self.epsilon)
         self.train_step = checkpoint.get('train_step', 0)
+        self.env_steps = checkpoint.get('env_steps', 0)
         self.episode_count = checkpoint.get('episode_count', 0)
         self.best_reward = checkpoint.get('best_reward', -float('inf'))
         self.best_finish_time = checkpoint.get('best_finish_time', 0.0)
         self.best_finish_episode = checkpoint.get('best_finish_episode', 0)
         
-        # Load replay buffer
-        if 'replay_buffer' in checkpoint and checkpoint['replay_buffer']:
+        # Load replay buffer (memory-mapped arrays; older checkpoints embed a dict)
+        replay_dir = checkpoint.get('replay_buffer_dir')
+        if replay_dir:
+            replay_dir = os.path.join(os.path.dirname(filepath), replay_dir)
+            if os.path.exists(os.path.join(replay_dir, ReplayBuffer.HEADER)):
+                self.replay_buffer = type(self.replay_buffer).load(replay_dir)
+            else:
+                print(f"Replay buffer missing at {replay_dir}, starting empty")
+        elif 'replay_buffer' in checkpoint and checkpoint['replay_buffer']:
             from scripts.replaybuffer import replaybuffer_from_dict
-            self.replay_buffer = replaybuffer_from_dict(checkpoint['replay_buffer'])
+            self.replay_buffer = replaybuffer_from_dict(checkpoint['replay_buffer'], type(self.replay_buffer))
         
         return True
\ No newline at end of file
@@ -0,0 +1,44 @@
+# observation.py - agent observations written in place into preallocated float32 arrays
+# Layout (STATE_DIM = 14):
+#   [0:11] ray distances / ray_length   [11] max(0, velocity / max_velocity)
+#   [12]   sin(angle)                   [13] cos(angle)
+import math
+import numpy as np
+
+from scripts.SimConstants import RAY_ANGLES
+
+NUM_RAYS = len(RAY_ANGLES)
+VELOCITY = NUM_RAYS
+SIN = NUM_RAYS + 1
+COS = NUM_RAYS + 2
+STATE_DIM = NUM_RAYS + 3
+
+
+class ObservationBuffer:
+    """
+    Two float32 (STATE_DIM,) arrays written alternately by write(), so the
+    state and next_state of one step are distinct arrays. An array stays
+    valid until the next-but-one write(); copy it to keep it longer (the
+    replay buffer copies into its own slots).
+    """
+    def __init__(self, depth=2):
+        self.arrays = [np.zeros(STATE_DIM, dtype=np.float32) for _ in range(depth)]
+        self._rays = [array[:NUM_RAYS] for array in self.arrays]  # views, made once
+        self._index = 0
+        self._ray_length = None
+        self._ray_scale = None  # float32 1 / ray_length (a Python float operand would be boxed per call)
+
+    def write(self, ray_distances, ray_length, velocity, max_velocity, angle):
+        """Fill the next array from one car's sensors and motion and return it"""
+        self._index = (self._index + 1) % len(self.arrays)
+        out = self.arrays[self._index]
+        if ray_length != self._ray_length:
+            self._ray_length, self._ray_scale = ray_length, np.float32(1.0 / ray_length)
+        rays = self._rays[self._index]
+        np.copyto(rays, ray_distances, casting='same_kind')  # float64 distances -> float32
+        np.multiply(rays, self._ray_scale, out=rays)
+        out[VELOCITY] = max(0.0, velocity / max_velocity)
+        angle_rad = math.radians(angle)
+        out[SIN] = math.sin(angle_rad)
+        out[COS] = math.cos(angle_rad)
+        return out
@@ -0,0 +1,142 @@
+# policy.py - inference-only DQN policy for gameplay and evaluation
+# Loads just the policy weights: from the slim <name>_policy.pt that save_model
+# writes next to every checkpoint, or by pulling model_state_dict out of the
+# full checkpoint. No target net, optimizer or replay buffer is built.
+# Compact exports (export_policy.py) may be narrower and/or store int8 weights.
+import os
+import random
+import numpy as np
+import torch
+
+from scripts.dqn import DQN, NumpyDQN
+
+
+def policy_path(checkpoint_path):
+    """models/actions_6/model.pt -> models/actions_6/model_policy.pt"""
+    root, ext = os.path.splitext(checkpoint_path)
+    return f"{root}_policy{ext or '.pt'}"
+
+
+def policy_export(policy_state_dict, state_dim, action_map, hidden=DQN.HIDDEN, int8=False):
+    """The dict stored in a slim policy file (weights + the shape of the network and action space)"""
+    return {
+        'model_state_dict': quantize_int8(policy_state_dict) if int8 else policy_state_dict,
+        'state_dim': state_dim,
+        'action_dim': len(action_map),
+        'action_map': list(action_map),
+        'hidden': list(hidden),
+        'quantization': 'int8' if int8 else None,
+    }
+
+
+def quantize_int8(state_dict):
+    """
+    Symmetric per-output-row int8 linear weights: <layer>.weight becomes int8
+    with a float32 <layer>.weight_scale. Everything else stays float32.
+    """
+    quantized = {}
+    for key, value in state_dict.items():
+        value = value.detach().cpu()
+        if key.startswith('fc') and key.endswith('.weight'):
+            scale = value.abs().amax(dim=1, keepdim=True).clamp(min=1e-12) / 127.0
+            quantized[key] = torch.round(value / scale).clamp(-127, 127).to(torch.int8)
+            quantized[key + '_scale'] = scale.float()
+        else:
+            quantized[key] = value
+    return quantized
+
+
+def dequantize_int8(state_dict):
+    """Inverse of quantize_int8 (float32 weights at int8 precision)"""
+    weights = {}
+    for key, value in state_dict.items():
+        if key.endswith('.weight_scale'):
+            continue
+        scale = state_dict.get(key + '_scale')
+        weights[key] = value.float() * scale if scale is not None else value
+    return weights
+
+
+class DQNPolicy:
+    """Greedy (optionally epsilon-greedy) actions from a trained policy network"""
+
+    ACTION_MAP = [0, 1, 3, 4, 5, 6]  # same space as DQNAgent
+
+    def __init__(self, state_dim=14, action_dim=6, device=None, epsilon=0.0, action_map=None, hidden=DQN.HIDDEN):
+        self.state_dim = state_dim
+        self.action_dim = action_dim
+        self.hidden = tuple(hidden)
+        self.device = device if device else torch.device('cpu')
+        self.epsilon = epsilon
+        self.action_map = np.asarray(action_map if action_map is not None else self.ACTION_MAP)
+        self.net = DQN(state_dim, action_dim, device=self.device, hidden=self.hidden).to(self.device)
+        self.net.eval()
+        # On CPU act() runs on a NumPy copy of the weights
+        self.numpy_net = NumpyDQN(self.net) if self.device.type == 'cpu' else None
+        self.loaded_from = None
+
+    @classmethod
+    def load(cls, filepath, device=None, epsilon=0.0, state_dim=14):
+        """
+        Build a policy from a slim policy file or a full checkpoint.
+        Given a checkpoint, its <name>_policy.pt is used when it is at least as new.
+        Returns None if neither exists.
+        """
+        slim = policy_path(filepath)
+        if os.path.exists(slim) and (not os.path.exists(filepath)
+                                     or os.path.getmtime(slim) >= os.path.getmtime(filepath)):
+            filepath = slim
+        if not os.path.exists(filepath):
+            print(f"No model found at {filepath}")
+            return None
+
+        try:
+            checkpoint = torch.load(filepath, map_location='cpu', weights_only=True)
+        except Exception:
+            # Older full checkpoints pickle the replay buffer alongside the weights
+            checkpoint = torch.load(filepath, map_location='cpu', weights_only=False)
+
+        action_map = checkpoint.get('action_map', cls.ACTION_MAP)
+        policy = cls(checkpoint.get('state_dim', state_dim), checkpoint.get('action_dim', len(action_map)),
+                     device=device, epsilon=epsilon, action_map=action_map,
+                     hidden=checkpoint.get('hidden', DQN.HIDDEN))
+        state_dict = checkpoint['model_state_dict']
+        if checkpoint.get('quantization') == 'int8':
+            state_dict = dequantize_int8(state_dict)
+        policy.net.load_state_dict(state_dict)
+        if policy.numpy_net is not None:
+            policy.numpy_net.refresh(policy.net)
+        policy.loaded_from = filepath
+        return policy
+
+    def save(self, filepath, int8=False):
+        """Export these weights as a slim policy file (int8: quantized linear weights)"""
+        state_dict = {k: v.detach().cpu() for k, v in self.net.state_dict().items()}
+        torch.save(policy_export(state_dict, self.state_dim, self.action_map.tolist(), self.hidden, int8), filepath)
+
+    def act(self, state):
+        """Environment action for one state"""
+        if state is None:
+            return int(self.action_map[0])  # coast
+        if self.epsilon and random.random() < self.epsilon:
+            return int(self.action_map[random.randrange(self.action_dim)])
+        if self.numpy_net is not None:
+            return int(self.action_map[self.numpy_net.greedy(state)])
+        with torch.inference_mode():
+            state_tensor = torch.as_tensor(np.asarray(state, dtype=np.float32), device=self.device)
+            agent_action = int(self.net(state_tensor.unsqueeze(0)).argmax())
+        return int(self.action_map[agent_action])
+
+    def act_batch(self, states):
+        """Environment actions for a batch of states (one forward pass)"""
+        states = np.asarray(states, dtype=np.float32)
+        if self.numpy_net is not None:
+            agent_actions = self.numpy_net.greedy(states)
+        else:
+            with torch.inference_mode():
+                q_values = self.net(torch.from_numpy(states).to(self.device))
+                agent_actions = q_values.argmax(dim=1).cpu().numpy()
+        if self.epsilon:
+            explore = np.random.random(len(states)) < self.epsilon
+            agent_actions[explore] = np.random.randint(0, self.action_dim, explore.sum())
+        return self.action_map[agent_actions]
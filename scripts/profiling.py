@@ -0,0 +1,73 @@
+# profiling.py - named timing scopes for the training hot path
+# Usage:  with profiler.scope('env_step'): ...
+# Disabled (PROFILE = False) a scope is one attribute check and a shared no-op
+# context manager; enabled it appends one perf_counter delta per scope exit.
+import contextlib
+import time
+import numpy as np
+
+from scripts.SimConstants import PROFILE
+
+_NULL_SCOPE = contextlib.nullcontext()
+
+
+class _Scope:
+    __slots__ = ('samples', 'start')
+
+    def __init__(self, samples):
+        self.samples = samples
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.samples.append(time.perf_counter() - self.start)
+
+
+class Profiler:
+    """
+    Collects durations per scope name until summary(reset=True).
+    summary() -> {name: {'p50': ms, 'p95': ms, 'max': ms, 'count': n}}
+    """
+    def __init__(self, enabled=PROFILE):
+        self.enabled = enabled
+        self.samples = {}
+
+    def scope(self, name):
+        if not self.enabled:
+            return _NULL_SCOPE
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = []
+        return _Scope(samples)
+
+    def summary(self, reset=True):
+        stats = {}
+        for name, samples in self.samples.items():
+            if not samples:
+                continue
+            ms = np.array(samples) * 1000.0
+            p50, p95 = np.percentile(ms, (50, 95))
+            stats[name] = {'p50': float(p50), 'p95': float(p95), 'max': float(ms.max()), 'count': len(ms)}
+        if reset:
+            self.samples = {}
+        return stats
+
+    @staticmethod
+    def log_dict(stats, prefix="profile"):
+        """Flatten a summary() into wandb keys: profile/<scope>_<stat>_ms"""
+        return {f"{prefix}/{name}_{key}_ms": value
+                for name, s in stats.items() for key, value in s.items() if key != 'count'}
+
+    @staticmethod
+    def format(stats):
+        """One line per scope, slowest p95 first"""
+        lines = []
+        for name, s in sorted(stats.items(), key=lambda item: -item[1]['p95']):
+            lines.append(f"{name:>10s}: p50 {s['p50']:7.3f} ms | p95 {s['p95']:7.3f} ms | "
+                         f"max {s['max']:8.3f} ms | n={s['count']}")
+        return lines
+
+
+# Shared by the trainer and the environments
+profiler = Profiler()
@@ -0,0 +1,471 @@
+# raycast.py - compiled track sensing for Car.cast_rays
+import math
+import numpy as np
+
+SQRT2 = math.sqrt(2.0)
+
+
+def distance_field(occupancy, max_distance=64):
+    """
+    Euclidean distance transform of a [x, y] occupancy grid.
+
+    Every cell holds the distance (px, centre to centre) to the nearest
+    occupied cell, clamped at max_distance. Occupied cells are 0.
+    Runs as two separable numpy passes: exact per-column distance first,
+    then a sweep over horizontal offsets up to max_distance.
+    """
+    width, height = occupancy.shape
+    cap = int(max_distance)
+    far = height + cap + 1
+
+    # Pass 1 - vertical distance to the nearest occupied cell in the same column
+    idx = np.arange(height, dtype=np.int32)
+    above = np.maximum.accumulate(np.where(occupancy, idx, -far), axis=1)
+    below = np.minimum.accumulate(np.where(occupancy, idx, far)[:, ::-1], axis=1)[:, ::-1]
+    column = np.minimum(idx - above, below - idx)
+    column = np.minimum(column, cap).astype(np.float32)
+    column_sq = column * column
+
+    # Pass 2 - combine columns within the clamp window
+    dist_sq = column_sq.copy()
+    for dx in range(1, cap + 1):
+        offset = float(dx * dx)
+        np.minimum(dist_sq[dx:], column_sq[:-dx] + offset, out=dist_sq[dx:])
+        np.minimum(dist_sq[:-dx], column_sq[dx:] + offset, out=dist_sq[:-dx])
+
+    np.minimum(dist_sq, float(cap * cap), out=dist_sq)
+    return np.sqrt(dist_sq)
+
+
+class TrackField:
+    """
+    Track border compiled once into numpy arrays:
+    - occupancy: bool [x, y], True where the border mask is set
+    - distance:  float32 [x, y], clamped distance to the nearest border pixel
+    """
+    _cache = {}
+
+    def __init__(self, occupancy, max_distance=64):
+        self.occupancy = np.ascontiguousarray(occupancy, dtype=bool)
+        self.width, self.height = self.occupancy.shape
+        self.max_distance = max_distance
+        self._distance = None
+        # All-False grid that casters may stamp and clear (never left dirty)
+        self.scratch = np.zeros_like(self.occupancy)
+
+    @property
+    def distance(self):
+        """Distance field, built on first use (only the sphere tracer needs it)"""
+        if self._distance is None:
+            self._distance = distance_field(self.occupancy, self.max_distance)
+        return self._distance
+
+    @classmethod
+    def from_mask(cls, mask, key=None, max_distance=64):
+        """Compile a pygame Mask (cached by key, e.g. the border image path)"""
+        if key is not None and key in cls._cache:
+            return cls._cache[key]
+
+        import pygame
+        surface = mask.to_surface(setcolor=(255, 255, 255, 255), unsetcolor=(0, 0, 0, 0))
+        occupancy = pygame.surfarray.array_alpha(surface) > 0
+
+        field = cls(occupancy, max_distance)
+        if key is not None:
+            cls._cache[key] = field
+        return field
+
+
+class CompositeField:
+    """
+    A TrackField's border occupancy with obstacle hitboxes stamped in, so a
+    sensor sample reads one bitmap. The border is copied once; afterwards
+    only box regions are written or restored from the base. distance stays
+    the border-only field of the base.
+    """
+    def __init__(self, base):
+        self.base = base
+        self.occupancy = base.occupancy.copy()
+        self.width, self.height = base.width, base.height
+        self.max_distance = base.max_distance
+        self.scratch = base.scratch
+
+    @property
+    def distance(self):
+        return self.base.distance
+
+    def stamp(self, x0, y0, x1, y1):
+        self.occupancy[x0:x1, y0:y1] = True
+
+    def restore(self, x0, y0, x1, y1, labels=None):
+        """Border (plus whatever boxes labels still shows) inside the region"""
+        if labels is None:
+            self.occupancy[x0:x1, y0:y1] = self.base.occupancy[x0:x1, y0:y1]
+        else:
+            np.logical_or(self.base.occupancy[x0:x1, y0:y1], labels[x0:x1, y0:y1] > 0,
+                          out=self.occupancy[x0:x1, y0:y1])
+
+
+def obstacle_boxes(obstacle_group):
+    """Hitboxes of an obstacle group as an (K, 4) array of [x0, y0, x1, y1) pixel bounds"""
+    if not obstacle_group:
+        return np.empty((0, 4), dtype=np.float64)
+    return np.array([
+        (o.hitbox.left, o.hitbox.top, o.hitbox.right, o.hitbox.bottom)
+        for o in obstacle_group
+    ], dtype=np.float64)
+
+
+class ObstacleIndex:
+    """
+    Bitmap index of live obstacle hitboxes over a width x height grid.
+
+    labels[x, y] holds 1 + the slot of the lowest-numbered live box covering
+    the pixel (0 = free), so a ray sample is one lookup and an overlap test
+    reads only the pixels under the car; the cost no longer grows with the
+    number of obstacles. Slots are handed out in add() order; remove() (an
+    obstacle destroyed) repaints just that box, clear() drops everything.
+    With a track field attached, .field is a CompositeField of that border
+    plus the live boxes, kept in step by the same calls.
+    """
+    def __init__(self, width, height, field=None):
+        self.labels = np.zeros((width, height), dtype=np.int16)
+        self.width, self.height = width, height
+        self.boxes = []  # clipped [x0, y0, x1, y1) per slot
+        self.alive = []
+        self.count = 0
+        self.field = None
+        if field is not None:
+            self.attach(field)
+
+    def __len__(self):
+        return self.count
+
+    def attach(self, field):
+        """Maintain a CompositeField of field (a TrackField on the same grid) and the live boxes"""
+        if (field.width, field.height) != (self.width, self.height):
+            raise ValueError(f"field is {field.width}x{field.height}, index is {self.width}x{self.height}")
+        self.field = CompositeField(field)
+        for box, alive in zip(self.boxes, self.alive):
+            if alive:
+                self.field.stamp(*box)
+
+    def _clip(self, box):
+        x0, y0, x1, y1 = (int(v) for v in box)
+        return max(x0, 0), max(y0, 0), min(x1, self.width), min(y1, self.height)
+
+    def add(self, box):
+        """Index one [x0, y0, x1, y1) hitbox, returns its slot"""
+        box = self._clip(box)
+        slot = len(self.boxes)
+        self.boxes.append(box)
+        self.alive.append(True)
+        self.count += 1
+        region = self.labels[box[0]:box[2], box[1]:box[3]]
+        region[region == 0] = slot + 1  # earlier slots keep the pixels they share
+        if self.field is not None:
+            self.field.stamp(*box)
+        return slot
+
+    def remove(self, slot):
+        if not self.alive[slot]:
+            return
+        self.alive[slot] = False
+        self.count -= 1
+        if self.count == 0:
+            self.clear()
+            return
+        x0, y0, x1, y1 = self.boxes[slot]
+        self.labels[x0:x1, y0:y1] = 0
+        # Repaint live boxes sharing the area, later slots first so earlier ones win
+        for other in range(len(self.boxes) - 1, -1, -1):
+            bx0, by0, bx1, by1 = self.boxes[other]
+            if self.alive[other] and bx0 < x1 and x0 < bx1 and by0 < y1 and y0 < by1:
+                self.labels[max(x0, bx0):min(x1, bx1), max(y0, by0):min(y1, by1)] = other + 1
+        if self.field is not None:
+            self.field.restore(x0, y0, x1, y1, self.labels)
+
+    def clear(self):
+        """Drop every box, touching only the regions they covered"""
+        for x0, y0, x1, y1 in self.boxes:
+            self.labels[x0:x1, y0:y1] = 0
+            if self.field is not None:
+                self.field.restore(x0, y0, x1, y1)
+        self.boxes = []
+        self.alive = []
+        self.count = 0
+
+    def rebuild(self, boxes):
+        """Replace the index contents (a new episode's layout); slot k is boxes[k]"""
+        self.clear()
+        self.boxes = [self._clip(box) for box in boxes]
+        self.alive = [True] * len(self.boxes)
+        self.count = len(self.boxes)
+        # Later slots first so earlier ones keep the pixels they share
+        for slot in range(len(self.boxes) - 1, -1, -1):
+            x0, y0, x1, y1 = self.boxes[slot]
+            self.labels[x0:x1, y0:y1] = slot + 1
+            if self.field is not None:
+                self.field.stamp(x0, y0, x1, y1)
+
+    def live_boxes(self):
+        """(K, 4) array of the live hitboxes, for casters that need explicit boxes"""
+        boxes = [b for b, alive in zip(self.boxes, self.alive) if alive]
+        return np.array(boxes, dtype=np.float64).reshape(-1, 4)
+
+    def _region(self, x0, y0, x1, y1):
+        """labels[x0:x1, y0:y1] clipped to the grid, plus the clip offsets into the query"""
+        cx0, cy0 = max(x0, 0), max(y0, 0)
+        cx1, cy1 = min(x1, self.width), min(y1, self.height)
+        if cx0 >= cx1 or cy0 >= cy1:
+            return None, 0, 0
+        return self.labels[cx0:cx1, cy0:cy1], cx0 - x0, cy0 - y0
+
+    def near(self, x0, y0, x1, y1):
+        """Sorted slots of live boxes visible inside [x0, x1) x [y0, y1)"""
+        region, _, _ = self._region(x0, y0, x1, y1)
+        if region is None or not region.any():
+            return []
+        return (np.unique(region[region > 0]) - 1).tolist()
+
+    def first_overlap(self, mask, left, top):
+        """Lowest slot whose box touches a set pixel of mask (bool [x, y]) placed at (left, top), or -1"""
+        w, h = mask.shape
+        region, ox, oy = self._region(left, top, left + w, top + h)
+        if region is None or not region.any():
+            return -1
+        hits = region[mask[ox:ox + region.shape[0], oy:oy + region.shape[1]]]
+        hits = hits[hits > 0]
+        return int(hits.min()) - 1 if hits.size else -1
+
+
+def ray_directions(ray_angles, car_angle):
+    """Unit direction of every sensor for a car rotated by car_angle (degrees)"""
+    directions = []
+    for angle in ray_angles:
+        rad = math.radians(angle + car_angle)
+        directions.append((-math.sin(rad), -math.cos(rad)))
+    return directions
+
+
+def _box_hits(origin, directions, boxes, max_length):
+    """First entry distance of every ray into any obstacle box (slab test)"""
+    hits = np.full(len(directions), float(max_length))
+    if len(boxes) == 0:
+        return hits
+
+    ox, oy = origin
+    dirs = np.asarray(directions, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv_x = 1.0 / dirs[:, 0:1]
+        inv_y = 1.0 / dirs[:, 1:2]
+        tx0 = (boxes[:, 0] - ox) * inv_x
+        tx1 = (boxes[:, 2] - ox) * inv_x
+        ty0 = (boxes[:, 1] - oy) * inv_y
+        ty1 = (boxes[:, 3] - oy) * inv_y
+    # Axis-parallel rays: inside the slab means the whole line, outside means never
+    tx0 = np.where(np.isnan(tx0), -np.inf, tx0)
+    tx1 = np.where(np.isnan(tx1), np.inf, tx1)
+    ty0 = np.where(np.isnan(ty0), -np.inf, ty0)
+    ty1 = np.where(np.isnan(ty1), np.inf, ty1)
+
+    t_enter = np.maximum(np.minimum(tx0, tx1), np.minimum(ty0, ty1))
+    t_exit = np.minimum(np.maximum(tx0, tx1), np.maximum(ty0, ty1))
+    valid = (t_exit > t_enter) & (t_exit > 0)
+    t_enter = np.where(valid, np.maximum(t_enter, 0.0), np.inf)
+    return np.minimum(hits, t_enter.min(axis=1))
+
+
+def sphere_trace(field, origin, directions, max_length, boxes=None, min_step=1.0, refine=4):
+    """
+    Cast rays against a TrackField using sphere tracing.
+
+    Each ray advances by the distance-field value (minus the half-diagonal
+    of both pixels, so it can never jump over a border pixel), then bisects
+    the last free interval for sub-pixel accuracy. Obstacle boxes are hit
+    analytically. Leaving the image counts as no hit, like the 8px marcher.
+    """
+    occupancy = field.occupancy.item
+    distance = field.distance.item
+    width, height = field.width, field.height
+    ox, oy = origin
+
+    hits = []
+    for dx, dy in directions:
+        t = 0.0
+        free = 0.0
+        hit = max_length
+        while t <= max_length:
+            ix, iy = int(ox + dx * t), int(oy + dy * t)
+            if not (0 <= ix < width and 0 <= iy < height):
+                break
+            d = distance(ix, iy)
+            if d == 0.0:
+                lo, hi = free, t
+                for _ in range(refine):
+                    mid = (lo + hi) * 0.5
+                    mx, my = int(ox + dx * mid), int(oy + dy * mid)
+                    if occupancy(mx, my):
+                        hi = mid
+                    else:
+                        lo = mid
+                hit = min(hi, max_length)
+                break
+            free = t
+            t += max(d - SQRT2, min_step)
+        hits.append(hit)
+
+    if boxes is not None and len(boxes):
+        return np.minimum(hits, _box_hits(origin, directions, boxes, max_length)).tolist()
+    return hits
+
+
+class RayCaster:
+    """
+    Vectorized fixed-step caster with the same sampling as the 8px marcher.
+
+    All cars x ray_angles x steps sample points are built as one array,
+    gathered from the occupancy grid in a single fancy index and reduced
+    with argmax to the first blocked (or off-image) sample per ray.
+    """
+    def __init__(self, ray_angles, max_length, step=8):
+        self.ray_angles = np.asarray(ray_angles, dtype=np.float64)
+        self.max_length = max_length
+        self.step = step
+        self.steps = np.arange(step, max_length + 1, step, dtype=np.float64)
+
+    def cast(self, field, origin, car_angle, boxes=None):
+        """Returns (distances[R], collision_points[R, 2]) for one car"""
+        distances, points = self.cast_batch(field, [origin], [car_angle], boxes)
+        return distances[0], points[0]
+
+    def cast_batch(self, field, positions, angles, boxes=None):
+        """
+        Cast the sensors of N cars in one pass.
+
+        positions: (N, 2), angles: (N,) in degrees.
+        boxes: obstacle hitboxes, either (K, 4) shared by every car,
+        (N, K, 4) per car, or an ObstacleIndex over the same grid as field.
+        Empty boxes (x0 == x1) never block.
+        Returns (distances[N, R], collision_points[N, R, 2]).
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        angles = np.asarray(angles, dtype=np.float64).reshape(-1)
+
+        rad = np.radians(angles[:, None] + self.ray_angles)
+        directions = np.empty(rad.shape + (2,))                                     # (N, R, 2)
+        np.negative(np.sin(rad), out=directions[..., 0])
+        np.negative(np.cos(rad), out=directions[..., 1])
+
+        xs = positions[:, 0, None, None] + directions[..., 0, None] * self.steps    # (N, R, S)
+        ys = positions[:, 1, None, None] + directions[..., 1, None] * self.steps
+        ix = xs.astype(np.intp)
+        iy = ys.astype(np.intp)
+
+        inside = (ix >= 0) & (ix < field.width) & (iy >= 0) & (iy < field.height)
+        ix = np.where(inside, ix, 0)
+        iy = np.where(inside, iy, 0)
+        blocked = field.occupancy[ix, iy]
+        if isinstance(boxes, ObstacleIndex):
+            if len(boxes):
+                blocked |= boxes.labels[ix, iy] > 0
+        elif boxes is not None and len(boxes):
+            boxes = np.asarray(boxes)
+            if boxes.ndim == 2:
+                blocked |= self._in_boxes(field, ix, iy, boxes)
+            elif boxes.shape[1]:
+                first = self._first_box_samples(positions, directions, boxes)
+                n, r = np.nonzero(first < len(self.steps))
+                blocked[n, r, first[n, r]] = True
+        blocked &= inside
+
+        # First sample that is either blocked or off the image ends the ray
+        first = (blocked | ~inside).argmax(axis=-1)
+        hit = blocked.reshape(-1, len(self.steps))[np.arange(first.size), first.ravel()].reshape(first.shape)
+        distances = np.where(hit, self.steps[first], float(self.max_length))
+        points = positions[:, None, :] + directions * distances[..., None]
+        return distances, points
+
+    def _in_boxes(self, field, ix, iy, boxes):
+        """(N, R, S) mask of samples inside any of the shared (K, 4) obstacle boxes"""
+        # Stamp the boxes into the field's scratch grid, gather, then clear
+        grid = field.scratch
+        stamped = [(max(x0, 0), max(y0, 0), x1, y1) for x0, y0, x1, y1 in boxes.astype(np.intp).tolist()]
+        for x0, y0, x1, y1 in stamped:
+            grid[x0:x1, y0:y1] = True
+        hits = grid[ix, iy]
+        for x0, y0, x1, y1 in stamped:
+            grid[x0:x1, y0:y1] = False
+        return hits
+
+    def _first_box_samples(self, positions, directions, boxes):
+        """
+        (N, R) index of the first sample inside any per-car (N, K, 4) box,
+        len(steps) where none is. The slab entry distance picks the
+        candidate samples; those are then tested exactly as cast_batch
+        computes them, so rounding at box edges cannot change the result.
+        """
+        num_steps = len(self.steps)
+        origin = positions[:, None, None, :]                                       # (N, 1, 1, 2)
+        # Axis-parallel rays get a tiny slope instead of a division by zero
+        inv = 1.0 / np.where(directions == 0, 1e-12, directions)[:, :, None, :]    # (N, R, 1, 2)
+        t0 = (boxes[:, None, :, :2] - origin) * inv                                # (N, R, K, 2)
+        t1 = (boxes[:, None, :, 2:] - origin) * inv
+        near, far = np.minimum(t0, t1), np.maximum(t0, t1)
+        t_enter = np.maximum(near[..., 0], near[..., 1])                           # (N, R, K)
+        t_exit = np.minimum(far[..., 0], far[..., 1])
+
+        # Only rays whose line passes the box (with a pixel of slack) get sample tests
+        first = np.full(directions.shape[:2], num_steps, dtype=np.intp)
+        n, r, k = np.nonzero((t_exit + 1 >= t_enter) & (t_exit >= 0) & (t_enter <= self.max_length + self.step))
+        if not len(n):
+            return first
+
+        # A box is at most ~14px across, so samples inside it are one step either side of the entry
+        nearest = np.ceil(np.clip(t_enter[n, r, k] / self.step, -1, num_steps + 1)).astype(np.intp) - 1
+        candidates = np.clip(nearest[:, None] + np.arange(-1, 2), 0, num_steps - 1)   # (M, 3)
+        t = self.steps[candidates]
+        ix = (positions[n, 0, None] + directions[n, r, 0, None] * t).astype(np.intp)
+        iy = (positions[n, 1, None] + directions[n, r, 1, None] * t).astype(np.intp)
+        b = boxes[n, k, None, :]                                                   # (M, 1, 4)
+        inside = (ix >= b[..., 0]) & (ix < b[..., 2]) & (iy >= b[..., 1]) & (iy < b[..., 3])
+        np.minimum.at(first, (n, r), np.where(inside, candidates, num_steps).min(axis=1))
+        return first
+
+
+def march_rays(field, origin, directions, max_length, boxes=None, step=8):
+    """
+    Reference fixed-step marcher (the original Car.cast_rays loop).
+    Used for parity checks and benchmarks against the compiled casters.
+    """
+    occupancy = field.occupancy
+    width, height = field.width, field.height
+    ox, oy = origin
+    boxes = [] if boxes is None else [tuple(b) for b in boxes]
+
+    hits = []
+    for dx, dy in directions:
+        hit = max_length
+        for dist in range(step, max_length + 1, step):
+            x, y = int(ox + dx * dist), int(oy + dy * dist)
+            if not (0 <= x < width and 0 <= y < height):
+                break
+            if occupancy[x, y]:
+                hit = dist
+                break
+            if any(x0 <= x < x1 and y0 <= y < y1 for x0, y0, x1, y1 in boxes):
+                hit = dist
+                break
+        hits.append(hit)
+    return hits
+
+
+def parity_check(field, origin, directions, max_length, distances, boxes=None, step=8):
+    """
+    Compare distances against the 8px reference marcher.
+    Returns per-ray (reference - distance). The marcher overshoots a true
+    hit by less than one step, so values outside (-1, step) mean the rays
+    disagree - usually the marcher jumping over a thin wall or box corner.
+    """
+    reference = march_rays(field, origin, directions, max_length, boxes, step)
+    return [r - d for r, d in zip(reference, distances)]
@@ -1,58 +1,343 @@
+import copy
+import json
+import os
 import numpy as np
-import random
 from collections import deque
 
+
 class ReplayBuffer:
-    def __init__(self, capacity=10000):
-        self.buffer = deque(maxlen=capacity)
+    """
+    Fixed-capacity ring buffer of transitions in preallocated numpy arrays.
+    Once full, add() overwrites the oldest transition.
+    Each transition carries the discount for its bootstrap term: gamma for
+    plain 1-step transitions (the default), gamma^n for n-step returns.
+    """
+    ARRAYS = ('states', 'actions', 'rewards', 'next_states', 'dones', 'discounts')
+    HEADER = 'header.json'
+
+    def __init__(self, capacity=10000, state_dim=14, gamma=0.99):
         self.capacity = capacity
+        self.state_dim = state_dim
+        self.gamma = gamma
+        self.states = np.zeros((capacity, state_dim), dtype=np.float32)
+        self.next_states = np.zeros((capacity, state_dim), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=np.float32)
+        self.discounts = np.full(capacity, gamma, dtype=np.float32)
+        self.position = 0  # next slot to write
+        self.size = 0
+
+    def add(self, state, action, reward, next_state, done, discount=None):
+        i = self.position
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self.discounts[i] = self.gamma if discount is None else discount
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
 
-    def add(self, state, action, reward, next_state, done):
-        experience = (state, action, reward, next_state, done)
-        self.buffer.append(experience)
+    def add_batch(self, states, actions, rewards, next_states, dones, discounts=None):
+        """Add N transitions at once (arrays with a leading N axis)"""
+        n = len(actions)
+        if discounts is None:
+            discounts = np.full(n, self.gamma, dtype=np.float32)
+        if n > self.capacity:
+            # Only the newest capacity transitions would survive anyway
+            states, actions, rewards, next_states, dones, discounts = (
+                a[-self.capacity:] for a in (states, actions, rewards, next_states, dones, discounts))
+            n = self.capacity
+        idx = (self.position + np.arange(n)) % self.capacity
+        self.states[idx] = states
+        self.actions[idx] = actions
+        self.rewards[idx] = rewards
+        self.next_states[idx] = next_states
+        self.dones[idx] = dones
+        self.discounts[idx] = discounts
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
 
     def sample(self, batch_size):
-        if len(self.buffer) < batch_size:
-            indices = range(len(self.buffer))
+        """Returns (states, actions, rewards, next_states, dones, discounts)"""
+        if self.size < batch_size:
+            indices = np.arange(self.size)
         else:
-            indices = random.sample(range(len(self.buffer)), batch_size)
-        batch = [self.buffer[i] for i in indices]
-        states = np.vstack([exp[0] for exp in batch])
-        actions = np.array([exp[1] for exp in batch], dtype=np.int64)
-        rewards = np.array([exp[2] for exp in batch], dtype=np.float32)
-        next_states = np.vstack([exp[3] for exp in batch])
-        dones = np.array([exp[4] for exp in batch], dtype=np.float32)
-        return states, actions, rewards, next_states, dones
+            indices = np.random.randint(0, self.size, size=batch_size)
+        return (self.states[indices], self.actions[indices], self.rewards[indices],
+                self.next_states[indices], self.dones[indices], self.discounts[indices])
 
     def __len__(self):
-        return len(self.buffer)
+        return self.size
+
+    def _ordered(self):
+        """Indices of stored transitions, oldest first"""
+        if self.size < self.capacity:
+            return np.arange(self.size)
+        return (self.position + np.arange(self.capacity)) % self.capacity
+
+    def _mapped_from(self, directory):
+        """True if every array is memory-mapped from the .npy files in directory"""
+        return all(isinstance(getattr(self, name), np.memmap) and
+                   getattr(self, name).filename == os.path.abspath(os.path.join(directory, name + '.npy'))
+                   for name in self.ARRAYS)
+
+    def snapshot(self, directory):
+        """
+        Frozen copy to save(directory) from another thread. Arrays mapped from
+        that directory are shared and only the cursor is copied (rows added
+        meanwhile are saved as the oldest ones); in-memory arrays are copied.
+        """
+        rb = copy.copy(self)
+        if not self._mapped_from(directory):
+            for name in self.ARRAYS:
+                setattr(rb, name, np.array(getattr(self, name)))
+        return rb
+
+    def save(self, directory):
+        """
+        Write the buffer as raw .npy arrays plus a header (capacity, cursor, size).
+        Arrays memory-mapped from the same directory are only flushed.
+        The header is written last, so a crash mid-save keeps the previous one.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            array = getattr(self, name)
+            path = os.path.join(directory, name + '.npy')
+            if isinstance(array, np.memmap) and array.filename == os.path.abspath(path):
+                array.flush()
+                continue
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp, path)
+
+        header = {
+            'capacity': self.capacity,
+            'state_dim': self.state_dim,
+            'gamma': self.gamma,
+            'position': self.position,
+            'size': self.size,
+        }
+        path = os.path.join(directory, self.HEADER)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(header, f)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r+'):
+        """
+        Open a buffer written by save(). With mmap_mode='r+' the arrays stay
+        on disk and are paged in on demand; later adds write through to the
+        files and the next save() only flushes them and rewrites the header.
+        """
+        with open(os.path.join(directory, cls.HEADER)) as f:
+            header = json.load(f)
+
+        rb = cls(capacity=header['capacity'], state_dim=header['state_dim'], gamma=header.get('gamma', 0.99))
+        for name in cls.ARRAYS:
+            path = os.path.join(directory, name + '.npy')
+            if name == 'discounts' and not os.path.exists(path):
+                continue  # saved before n-step returns: every transition is 1-step
+            array = np.load(path, mmap_mode=mmap_mode)
+            if len(array) != rb.capacity:
+                raise ValueError(f"{name}.npy has {len(array)} rows, header says capacity {rb.capacity}")
+            setattr(rb, name, array)
+        rb.position = header['position']
+        rb.size = header['size']
+        return rb
 
     def to_dict(self):
         """Serialize the replay buffer to a plain dict."""
-        serialized = {'capacity': self.capacity, 'buffer': []}
-        for state, action, reward, next_state, done in self.buffer:
-            if isinstance(state, np.ndarray):
-                state_ser = state.tolist()
-            else:
-                state_ser = state
-            if isinstance(next_state, np.ndarray):
-                next_state_ser = next_state.tolist()
-            else:
-                next_state_ser = next_state
-            serialized['buffer'].append([state_ser, action, reward, next_state_ser, done])
-        return serialized
-
-def replaybuffer_from_dict(data):
+        order = self._ordered()
+        return {
+            'capacity': self.capacity,
+            'discounts': self.discounts[order].tolist(),
+            'buffer': [list(t) for t in zip(self.states[order].tolist(), self.actions[order].tolist(),
+                                            self.rewards[order].tolist(), self.next_states[order].tolist(),
+                                            self.dones[order].astype(bool).tolist())],
+        }
+
+
+class SumTree:
+    """
+    Binary tree of priority sums in one flat array: node i has children
+    2i and 2i+1, leaves start at self.leaves. Updates and prefix-sum
+    searches are O(log n) and vectorized over a batch of indices.
+    """
+    def __init__(self, capacity):
+        self.leaves = 1
+        while self.leaves < capacity:
+            self.leaves *= 2
+        self.depth = self.leaves.bit_length() - 1
+        self.tree = np.zeros(2 * self.leaves, dtype=np.float64)
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    def get(self, indices):
+        return self.tree[self.leaves + np.asarray(indices)]
+
+    def update(self, indices, priorities):
+        nodes = self.leaves + np.asarray(indices)
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def rebuild(self, priorities):
+        """Set every leaf at once and recompute all sums bottom-up"""
+        self.tree[:] = 0.0
+        self.tree[self.leaves:self.leaves + len(priorities)] = priorities
+        for level in range(self.depth - 1, -1, -1):
+            start, end = 1 << level, 1 << (level + 1)
+            self.tree[start:end] = self.tree[2 * start:2 * end:2] + self.tree[2 * start + 1:2 * end:2]
+
+    def find(self, values):
+        """Leaf index whose cumulative priority range contains each value"""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.intp)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            left_sum = self.tree[left]
+            go_right = values > left_sum
+            values -= left_sum * go_right
+            nodes = left + go_right
+        return nodes - self.leaves
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    Proportional prioritized replay (Schaul et al.) on top of the ring buffer.
+    P(i) = p_i^alpha / sum p^alpha with p_i = |TD error| + eps; new transitions
+    get the highest priority seen so far. sample() also returns importance-
+    sampling weights (beta annealed towards 1) and the sampled indices for
+    update_priorities().
+    """
+    def __init__(self, capacity=10000, state_dim=14, gamma=0.99, alpha=0.6, beta=0.4, beta_increment=1e-5, eps=1e-3):
+        super().__init__(capacity, state_dim, gamma)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.eps = eps
+        self.max_priority = 1.0
+        self.priorities = np.zeros(capacity, dtype=np.float64)  # p^alpha per slot, mirrored in the tree
+        self.tree = SumTree(capacity)
+
+    def add(self, state, action, reward, next_state, done, discount=None):
+        i = self.position
+        super().add(state, action, reward, next_state, done, discount)
+        self._set_priorities([i], self.max_priority ** self.alpha)
+
+    def add_batch(self, states, actions, rewards, next_states, dones, discounts=None):
+        n = min(len(actions), self.capacity)
+        idx = (self.position + np.arange(n)) % self.capacity
+        super().add_batch(states, actions, rewards, next_states, dones, discounts)
+        self._set_priorities(idx, self.max_priority ** self.alpha)
+
+    def _set_priorities(self, indices, priorities):
+        self.priorities[indices] = priorities
+        self.tree.update(indices, self.priorities[indices])
+
+    def sample(self, batch_size):
+        """Returns (states, actions, rewards, next_states, dones, discounts, weights, indices)"""
+        batch_size = min(batch_size, self.size)
+        # One uniform draw per equal slice of the total priority mass
+        segment = self.tree.total / batch_size
+        values = (np.arange(batch_size) + np.random.random(batch_size)) * segment
+        indices = np.minimum(self.tree.find(values), self.size - 1)
+
+        probabilities = self.priorities[indices] / self.tree.total
+        weights = (self.size * probabilities) ** -self.beta
+        weights = (weights / weights.max()).astype(np.float32)
+        self.beta = min(1.0, self.beta + self.beta_increment)
+
+        return (self.states[indices], self.actions[indices], self.rewards[indices],
+                self.next_states[indices], self.dones[indices], self.discounts[indices], weights, indices)
+
+    def update_priorities(self, indices, td_errors):
+        priorities = np.abs(td_errors) + self.eps
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self._set_priorities(indices, priorities ** self.alpha)
+
+    def snapshot(self, directory):
+        rb = super().snapshot(directory)
+        rb.priorities = self.priorities.copy()
+        return rb
+
+    def save(self, directory):
+        """Ring arrays as in ReplayBuffer.save, plus priorities.npy"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, 'priorities.npy')
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, self.priorities)
+        os.replace(path + '.tmp', path)
+        super().save(directory)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r+'):
+        rb = super().load(directory, mmap_mode)
+        path = os.path.join(directory, 'priorities.npy')
+        if os.path.exists(path):
+            rb.priorities = np.load(path)
+        else:
+            # Saved by a uniform buffer: every stored transition starts equal
+            rb.priorities[:rb.size] = 1.0
+        rb.max_priority = max(1.0, float(rb.priorities.max()) ** (1 / rb.alpha))
+        rb.tree.rebuild(rb.priorities)
+        return rb
+
+
+class NStepAccumulator:
+    """
+    Turns one episode stream of 1-step transitions into n-step ones:
+    (s_t, a_t, sum_k gamma^k r_{t+k}, s_{t+n}, done, gamma^n).
+    When an episode ends, the remaining shorter returns are flushed with
+    done=True, so no return ever crosses an episode boundary.
+    """
+    def __init__(self, n, gamma):
+        self.n = n
+        self.gamma = gamma
+        self.pending = deque()  # (state, action, reward), oldest first
+
+    def append(self, state, action, reward, next_state, done):
+        """Add one step; returns the transitions that became complete"""
+        self.pending.append((np.array(state, dtype=np.float32), action, reward))  # env states are reused arrays
+        ready = []
+        if len(self.pending) == self.n:
+            ready.append(self._emit(next_state, done))
+        if done:
+            while self.pending:
+                ready.append(self._emit(next_state, done))
+        return ready
+
+    def _emit(self, next_state, done):
+        ret = 0.0
+        for k, (_, _, reward) in enumerate(self.pending):
+            ret += self.gamma ** k * reward
+        state, action, _ = self.pending.popleft()
+        return state, action, ret, next_state, done, self.gamma ** (len(self.pending) + 1)
+
+    def reset(self):
+        self.pending.clear()
+
+
+def replaybuffer_from_dict(data, buffer_class=ReplayBuffer):
     """
     Recreate a ReplayBuffer from a dict produced by ReplayBuffer.to_dict.
     This function avoids silent try/except so data problems are visible.
     """
     capacity = data.get('capacity', 10000)
     buffer_data = data.get('buffer', [])
-    rb = ReplayBuffer(capacity=capacity)
-    rb.buffer.clear()
-    for state_ser, action, reward, next_state_ser, done in buffer_data:
-        state_arr = np.array(state_ser, dtype=np.float32)
-        next_state_arr = np.array(next_state_ser, dtype=np.float32)
-        rb.buffer.append((state_arr, action, reward, next_state_arr, done))
-    return rb
\ No newline at end of file
+    if not buffer_data:
+        return buffer_class(capacity=capacity)
+    states, actions, rewards, next_states, dones = zip(*buffer_data)
+    states = np.array(states, dtype=np.float32)
+    rb = buffer_class(capacity=capacity, state_dim=states.shape[1])
+    discounts = data.get('discounts')
+    rb.add_batch(states, np.array(actions, dtype=np.int64), np.array(rewards, dtype=np.float32),
+                 np.array(next_states, dtype=np.float32), np.array(dones, dtype=np.float32),
+                 None if discounts is None else np.array(discounts, dtype=np.float32))
+    return rb
@@ -0,0 +1,70 @@
+# rewards.py - training reward (pygame-free, shared by the trainer and actor processes)
+import numpy as np
+
+
+def calculate_reward(environment, step_info):
+    """Simple reward calculation"""
+    reward = 0.0
+    
+    # 1. Speed reward (encourage moving fast)
+    speed_ratio = abs(environment.car.velocity) / environment.car.max_velocity
+    if speed_ratio >= 0.8:
+        reward += 1.5
+    elif speed_ratio >= 0.5:
+        reward += 0.5
+    else:
+        reward -= 0.5
+    
+    # 2. Edge penalty (stay away from walls)
+    if environment.car.ray_distances:
+        min_ray = min(environment.car.ray_distances) / environment.car.ray_length
+        if min_ray < 0.1:
+            reward -= 2.0
+        elif min_ray < 0.2:
+            reward -= 0.5
+    
+    # 3. Checkpoint crossed (big reward!)
+    if step_info.get("checkpoint_crossed", False):
+        reward += 50.0
+    
+    # 4. Backward crossing (bad!)
+    if step_info.get("backward_crossed", False):
+        reward -= 30.0
+    
+    # 5. Hit obstacle
+    if step_info.get("hit_obstacle", False):
+        reward -= 10.0
+    
+    # 6. Finished race (huge reward!)
+    if step_info.get("finished", False):
+        reward += 500.0
+        # Time bonus
+        time_ratio = environment.time_remaining / environment.max_time
+        reward += time_ratio * 200.0
+    
+    # 7. Crashed (big penalty)
+    if step_info.get("collision", False):
+        reward -= 200.0
+    
+    # 8. Timeout
+    if step_info.get("timeout", False):
+        reward -= 100.0
+    
+    return float(reward)
+
+
+def calculate_rewards(environment, infos):
+    """calculate_reward for every car of a VecAIEnvironment step (infos hold pre-reset values)"""
+    speed_ratio = np.abs(infos['velocity']) / environment.max_velocity
+    reward = np.select([speed_ratio >= 0.8, speed_ratio >= 0.5], [1.5, 0.5], -0.5)
+
+    min_ray = infos['min_ray']
+    reward -= np.select([min_ray < 0.1, min_ray < 0.2], [2.0, 0.5], 0.0)
+
+    reward += 50.0 * infos['checkpoint_crossed']
+    reward -= 30.0 * infos['backward_crossed']
+    reward -= 10.0 * infos['hit_obstacle']
+    reward += infos['finished'] * (500.0 + infos['time_remaining'] / environment.max_time * 200.0)
+    reward -= 200.0 * infos['collision']
+    reward -= 100.0 * infos['timeout']
+    return reward
@@ -0,0 +1,535 @@
+# simcore.py - pygame-free simulation core for AI training
+# Reproduces AIEnvironment (Car physics, border/finish/obstacle collisions,
+# checkpoints, ray sensors) on precompiled numpy arrays. pygame is only
+# needed once to compile the track arrays, and for the optional draw().
+import math
+import os
+import random
+import numpy as np
+
+from scripts.SimConstants import *
+from scripts.checkpoint import CheckpointManager
+from scripts.raycast import TrackField, RayCaster, ObstacleIndex, ray_directions, sphere_trace
+from scripts.profiling import profiler
+from scripts.observation import ObservationBuffer
+
+OBSTACLE_HALF_SIZE = 5  # Obstacle hitbox is the 10x10 centre of its 20x20 sprite
+INFO_KEYS = ('collision', 'finished', 'hit_obstacle', 'timeout', 'checkpoint_crossed', 'backward_crossed')
+
+_tracks = {}
+
+
+# ============================================================================
+# TRACK COMPILATION
+# ============================================================================
+
+def _mask_to_array(mask):
+    """pygame Mask -> bool [x, y] array"""
+    import pygame
+    surface = mask.to_surface(setcolor=(255, 255, 255, 255), unsetcolor=(0, 0, 0, 0))
+    return pygame.surfarray.array_alpha(surface) > 0
+
+
+def _overlap_word_size():
+    """Bits per pygame bitmask word (64 on Linux/macOS, 32 on Windows)"""
+    import pygame
+    a = pygame.mask.Mask((128, 2))
+    a.set_at((10, 1))
+    a.set_at((40, 0))
+    # Same word: lowest row wins -> (40, 0). Different words: leftmost word wins -> (10, 1)
+    return 64 if a.overlap(pygame.mask.Mask((128, 2), fill=True), (0, 0)) == (40, 0) else 32
+
+
+def _asset_path(path):
+    """Asset paths in Constants use Windows separators; rebuild them for this OS"""
+    return os.path.join(*path.replace('\\', '/').split('/'))
+
+
+def compile_track(path=TRACK_ARRAYS, car_color="Red"):
+    """
+    Render the track assets to numpy arrays with pygame and save them to path:
+    border/finish occupancy, and the car mask for every ROTATION_STEP bucket.
+    """
+    import pygame
+    from scripts.Constants import TRACK_BORDER, FINISHLINE, CAR_COLORS
+
+    sources = [_asset_path(p) for p in (TRACK_BORDER, FINISHLINE, CAR_COLORS[car_color])]
+    border_path, finish_path, car_path = sources
+
+    border = pygame.mask.from_surface(pygame.image.load(border_path))
+    finish = pygame.mask.from_surface(
+        pygame.transform.scale(pygame.image.load(finish_path), FINISHLINE_SIZE)
+    )
+
+    car_image = pygame.transform.scale(pygame.image.load(car_path), (19, 38))
+    buckets = round(360 / ROTATION_STEP)
+    car_masks = [
+        _mask_to_array(pygame.mask.from_surface(pygame.transform.rotate(car_image, b * ROTATION_STEP)))
+        for b in range(buckets)
+    ]
+    car_sizes = np.array([m.shape for m in car_masks], dtype=np.int32)
+    padded = np.zeros((buckets, car_sizes[:, 0].max(), car_sizes[:, 1].max()), dtype=bool)
+    for b, m in enumerate(car_masks):
+        padded[b, :m.shape[0], :m.shape[1]] = m
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp.npz'
+    np.savez_compressed(
+        tmp,
+        border=_mask_to_array(border),
+        finish=_mask_to_array(finish),
+        car_masks=padded,
+        car_sizes=car_sizes,
+        rotation_step=ROTATION_STEP,
+        overlap_word=_overlap_word_size(),
+        sources=np.array(sources),
+    )
+    os.replace(tmp, path)
+    print(f"✓ Compiled track arrays to {path}")
+
+
+def load_track(path=TRACK_ARRAYS):
+    """Load compiled track arrays (compiling them first if missing or stale)"""
+    if path in _tracks:
+        return _tracks[path]
+
+    data = np.load(path) if os.path.exists(path) else None
+    if data is not None and _track_stale(path, data):
+        data = None
+
+    if data is None:
+        compile_track(path)
+        data = np.load(path)
+
+    track = SimTrack(data)
+    _tracks[path] = track
+    return track
+
+
+def _track_stale(path, data):
+    """Compiled with another ROTATION_STEP, before sources were recorded, or older than a source image"""
+    if float(data['rotation_step']) != ROTATION_STEP or 'sources' not in data:
+        return True
+    compiled = os.path.getmtime(path)
+    return any(os.path.exists(source) and os.path.getmtime(source) > compiled
+               for source in data['sources'].tolist())
+
+
+class SimTrack:
+    """Compiled track: border field, finish line and rotated car masks"""
+    def __init__(self, data):
+        self.field = TrackField(data['border'])
+        self.finish = data['finish']
+        self.finish_position = (int(FINISHLINE_POS[0]), int(FINISHLINE_POS[1]))
+        self.car_masks = data['car_masks']
+        self.car_sizes = data['car_sizes'].tolist()
+        self.buckets = len(self.car_sizes)
+        self.overlap_word = int(data['overlap_word'])
+
+
+# ============================================================================
+# MASK HELPERS (same results as pygame.mask.Mask.overlap)
+# ============================================================================
+
+def _round(value):
+    """Round half away from zero, like pygame Rect coordinates"""
+    return int(value + 0.5) if value >= 0 else -int(-value + 0.5)
+
+
+def _overlap_region(a, b, offset):
+    """Overlapping part of a and b placed at offset, plus its origin in a"""
+    ox, oy = offset
+    x0, y0 = max(ox, 0), max(oy, 0)
+    x1, y1 = min(ox + b.shape[0], a.shape[0]), min(oy + b.shape[1], a.shape[1])
+    if x0 >= x1 or y0 >= y1:
+        return None, x0, y0
+    return a[x0:x1, y0:y1] & b[x0 - ox:x1 - ox, y0 - oy:y1 - oy], x0, y0
+
+
+def mask_overlaps(a, b, offset):
+    """True if mask b placed at offset inside a touches any set pixel of a"""
+    region, _, _ = _overlap_region(a, b, offset)
+    return region is not None and bool(region.any())
+
+
+def mask_overlap(a, b, offset, word=64):
+    """
+    First overlapping pixel in a's coordinates, or None.
+    pygame scans word-wide column strips left to right and rows top to
+    bottom, so the answer is the top-most pixel of the left-most strip.
+    """
+    region, x0, y0 = _overlap_region(a, b, offset)
+    if region is None:
+        return None
+    xs, ys = np.nonzero(region)
+    if not len(xs):
+        return None
+    xs += x0
+    ys += y0
+    strip = xs // word
+    in_strip = strip == strip.min()
+    y = ys[in_strip].min()
+    x = xs[in_strip & (ys == y)].min()
+    return int(x), int(y)
+
+
+# ============================================================================
+# CAR
+# ============================================================================
+
+class SimCar:
+    """Car physics without pygame - same update rules as Car, sprite replaced by a mask bucket"""
+    def __init__(self, x, y, track):
+        self.track = track
+        self.x, self.y = float(x), float(y)
+
+        # Physics
+        self.max_velocity = MAXSPEED
+        self.velocity = 0
+        self.rotation_velocity = ROTATESPEED
+        self.angle = 0
+        self.acceleration = ACCELERATION
+
+        # State
+        self.failed = False
+        self.can_move = True
+
+        # Ray sensors
+        self.ray_length = RAY_LENGTH
+        self.ray_angles = list(RAY_ANGLES)
+        self.ray_distances = [self.ray_length] * len(self.ray_angles)
+        self.ray_array = np.full(len(self.ray_angles), float(self.ray_length))  # same distances, as cast
+        self.ray_collision_points = [None] * len(self.ray_angles)
+
+    @property
+    def position(self):
+        return self.x, self.y
+
+    @property
+    def bucket(self):
+        return round(self.angle / ROTATION_STEP) % self.track.buckets
+
+    @property
+    def mask(self):
+        """Collision mask for the current angle (bool [x, y])"""
+        bucket = self.bucket
+        w, h = self.track.car_sizes[bucket]
+        return self.track.car_masks[bucket, :w, :h]
+
+    @property
+    def topleft(self):
+        """Top-left of the rotated sprite rect centred on the car"""
+        w, h = self.track.car_sizes[self.bucket]
+        return _round(self.x) - w // 2, _round(self.y) - h // 2
+
+    def rotate(self, left=False, right=False):
+        if not self.can_move:
+            return
+        turn = 0
+        if left: turn += 1
+        if right: turn -= 1
+        self.angle += turn * self.rotation_velocity * (0.4 + 0.6 * (abs(self.velocity) / self.max_velocity))
+
+    def move(self):
+        if not self.can_move:
+            return
+        radians = math.radians(self.angle)
+        self.x -= math.sin(radians) * self.velocity
+        self.y -= math.cos(radians) * self.velocity
+
+    def accelerate(self, forward=True):
+        if not self.can_move:
+            return
+        if forward:
+            self.velocity = min(self.velocity + self.acceleration, self.max_velocity)
+        else:
+            self.velocity = max(self.velocity - self.acceleration, -self.max_velocity / 2)
+        self.move()
+
+    def reduce_speed(self):
+        if not self.can_move:
+            return
+        if self.velocity > 0:
+            self.velocity = max(self.velocity - self.acceleration * 0.3, 0)
+        elif self.velocity < 0:
+            self.velocity = min(self.velocity + self.acceleration * 0.3, 0)
+        self.move()
+
+    def reset(self, x=None, y=None):
+        if x is not None and y is not None:
+            self.x, self.y = float(x), float(y)
+        self.velocity = 0
+        self.angle = 0
+        self.failed = False
+        self.can_move = True
+        self.ray_distances = [self.ray_length] * len(self.ray_angles)
+        self.ray_array = np.full(len(self.ray_angles), float(self.ray_length))
+        self.ray_collision_points = [None] * len(self.ray_angles)
+
+    def observe(self, buffer):
+        """Write the agent observation for the last ray cast into buffer (ObservationBuffer)"""
+        return buffer.write(self.ray_array, self.ray_length, self.velocity, self.max_velocity, self.angle)
+
+
+# ============================================================================
+# ENVIRONMENT
+# ============================================================================
+
+class HeadlessAIEnvironment:
+    """
+    Drop-in replacement for AIEnvironment that runs without pygame.
+    surface is only used by draw() and may be None.
+    action_repeat frames are simulated per step(); with a reward_fn
+    (e.g. rewards.calculate_reward) step_info['reward'] is their summed reward.
+    """
+    def __init__(self, surface=None, track=None, action_repeat=ACTION_REPEAT, reward_fn=None):
+        self.surface = surface
+        self.track = track if track is not None else load_track()
+        self.action_repeat = max(1, int(action_repeat))
+        self.reward_fn = reward_fn
+
+        # Car
+        self.car = SimCar(*CAR_START_POS, self.track)
+        self.observations = ObservationBuffer()
+        self.ray_caster = RayCaster(self.car.ray_angles, self.car.ray_length)
+
+        # Obstacles: centres, hitboxes [x0, y0, x1, y1), alive flags and a bitmap index of the live ones
+        self.num_obstacles = 15
+        # The index keeps a per-env copy of the border with the live hitboxes stamped in (.field)
+        self.obstacle_index = ObstacleIndex(self.track.field.width, self.track.field.height, self.track.field)
+        self._generate_obstacles()
+
+        # Checkpoint manager
+        self.checkpoint_manager = CheckpointManager()
+
+        # Time
+        self.max_time = TARGET_TIME
+        self.time_remaining = self.max_time
+
+        # Episode state
+        self.episode_ended = False
+        self.car_finished = False
+        self.car_crashed = False
+        self.car_timeout = False
+
+        # Lazily loaded sprites for draw()
+        self._sprites = None
+
+    def _generate_obstacles(self):
+        self.place_obstacles(random.sample(BOMB_LIST, self.num_obstacles))
+
+    def place_obstacles(self, positions):
+        """Use a specific obstacle layout (list of centre points)"""
+        self.obstacle_positions = [tuple(p) for p in positions]
+        self.obstacle_boxes = np.array([
+            (x - OBSTACLE_HALF_SIZE, y - OBSTACLE_HALF_SIZE, x + OBSTACLE_HALF_SIZE, y + OBSTACLE_HALF_SIZE)
+            for x, y in self.obstacle_positions
+        ], dtype=np.float64).reshape(-1, 4)
+        self.obstacle_alive = [True] * len(self.obstacle_positions)
+        self.obstacle_index.rebuild(self.obstacle_boxes.astype(int).tolist())
+
+    def reset(self):
+        self.car.reset(*CAR_START_POS)
+
+        # Reshuffle obstacles
+        self._generate_obstacles()
+
+        self.checkpoint_manager.reset()
+
+        self.time_remaining = self.max_time
+        self.episode_ended = False
+        self.car_finished = False
+        self.car_crashed = False
+        self.car_timeout = False
+
+    def get_state(self):
+        """
+        State: 14 float32 values (layout in observation.py)
+        - 11 rays (normalized)
+        - 1 velocity (normalized)
+        - 2 orientation (sin/cos)
+        The array is reused: it is overwritten by the next-but-one get_state().
+        """
+        with profiler.scope('get_state'):
+            self._cast_rays()
+
+        return self.car.observe(self.observations)
+
+    def _cast_rays(self):
+        car = self.car
+        origin = car.position
+
+        if RAY_CASTER == "sdf":
+            directions = ray_directions(car.ray_angles, car.angle)
+            boxes = self.obstacle_boxes[self.obstacle_alive]
+            distances = sphere_trace(self.track.field, origin, directions, car.ray_length, boxes)
+            points = [(origin[0] + dx * d, origin[1] + dy * d) for d, (dx, dy) in zip(distances, directions)]
+            car.ray_array = distances
+        else:
+            distances, points = self.ray_caster.cast(self.obstacle_index.field, origin, car.angle)
+            car.ray_array = distances
+            distances = distances.tolist()
+            points = points.tolist()
+
+        car.ray_distances = distances
+        car.ray_collision_points = points
+
+    def step(self, action):
+        """
+        Hold action for action_repeat frames (ending early with the episode)
+        and cast the sensors once, after the last frame. step_info flags are
+        OR-ed over the frames; earlier frames are rewarded on the previous
+        sensor readings.
+        """
+        if self.episode_ended:
+            step_info = dict.fromkeys(INFO_KEYS, False)
+            next_state = self.get_state()
+            if self.reward_fn is not None:
+                step_info['reward'] = self.reward_fn(self, step_info)
+            return next_state, step_info, True
+
+        step_info = dict.fromkeys(INFO_KEYS, False)
+        reward = 0.0
+        for frame in range(self.action_repeat):
+            frame_info = self._frame(action)
+            last = frame == self.action_repeat - 1 or self.episode_ended
+            if last:
+                next_state = self.get_state()
+            if self.reward_fn is not None:
+                with profiler.scope('reward'):
+                    reward += self.reward_fn(self, frame_info)
+            for key, value in frame_info.items():
+                step_info[key] = step_info[key] or value
+            if last:
+                break
+
+        if self.reward_fn is not None:
+            step_info['reward'] = reward
+        return next_state, step_info, self.episode_ended
+
+    def _frame(self, action):
+        """One 1/FPS frame of physics, checkpoint, obstacle, finish and border checks"""
+        pre_velocity = self.car.velocity
+        self._handle_car_movement(action)
+
+        crossed, backward = self.checkpoint_manager.check_crossing(self.car.position)
+
+        step_info = {
+            'collision': False, 'finished': False, 'hit_obstacle': False,
+            'timeout': False, 'checkpoint_crossed': crossed, 'backward_crossed': backward
+        }
+
+        step_info['hit_obstacle'] = self._check_obstacle(pre_velocity)
+        step_info['finished'] = self._check_finish()
+        step_info['collision'] = self._check_collision()
+
+        self.time_remaining = max(0, self.time_remaining - 1/FPS)
+        if self.time_remaining <= 0 and not self.car_finished and not self.car_crashed:
+            self.car.can_move = False
+            self.car_timeout = True
+            step_info['timeout'] = True
+            self.episode_ended = True
+
+        return step_info
+
+    def _handle_car_movement(self, action):
+        if action is None: return
+        moving = action in [1, 2, 5, 6, 7, 8]
+        if action in [3, 5, 7]: self.car.rotate(left=True)
+        elif action in [4, 6, 8]: self.car.rotate(right=True)
+        if action in [1, 5, 6]: self.car.accelerate(True)
+        elif action in [2, 7, 8]: self.car.accelerate(False)
+        if not moving: self.car.reduce_speed()
+
+    def _check_obstacle(self, pre_velocity):
+        # Lowest-numbered live obstacle under the car mask, from the bitmap index
+        left, top = self.car.topleft
+        k = self.obstacle_index.first_overlap(self.car.mask, left, top)
+        if k < 0:
+            return False
+        self.car.velocity *= 0.25
+        self.obstacle_alive[k] = False
+        self.obstacle_index.remove(k)
+        return pre_velocity > 1.0
+
+    def _finish_overlap(self):
+        left, top = self.car.topleft
+        fx, fy = self.track.finish_position
+        return mask_overlap(self.track.finish, self.car.mask, (left - fx, top - fy), self.track.overlap_word)
+
+    def _check_finish(self):
+        if self.car_finished or self.car_crashed: return False
+        if overlap := self._finish_overlap():
+            if overlap[1] > 2:
+                self.car_finished = True
+                self.episode_ended = True
+                return True
+        return False
+
+    def _check_collision(self):
+        if self.car_crashed: return False
+        if mask_overlaps(self.track.field.occupancy, self.car.mask, self.car.topleft):
+            self.car.failed = True
+            self.car.can_move = False
+            self.car_crashed = True
+            self.episode_ended = True
+            return True
+        if overlap := self._finish_overlap():
+            if overlap[1] <= 2:
+                self.car.failed = True
+                self.car.can_move = False
+                self.car_crashed = True
+                self.episode_ended = True
+                return True
+        return False
+
+    def draw(self):
+        """Optional rendering - the only part that needs pygame"""
+        if self.surface is None:
+            return
+        import pygame
+        from scripts.Constants import TRACK_BORDER, FINISHLINE, CAR_COLORS, GREEN, YELLOW, RED, WHITE
+
+        if self._sprites is None:
+            car_image = pygame.transform.scale(pygame.image.load(_asset_path(CAR_COLORS["Red"])).convert_alpha(), (19, 38))
+            obstacle = pygame.Surface((20, 20), pygame.SRCALPHA)
+            pygame.draw.rect(obstacle, (255, 0, 0), (5, 5, 10, 10))
+            self._sprites = {
+                'border': pygame.image.load(_asset_path(TRACK_BORDER)).convert_alpha(),
+                'finish': pygame.transform.scale(pygame.image.load(_asset_path(FINISHLINE)).convert_alpha(), FINISHLINE_SIZE),
+                'car': car_image,
+                'obstacle': obstacle,
+            }
+        sprites = self._sprites
+
+        self.surface.fill((0, 0, 0))
+        for (x, y), alive in zip(self.obstacle_positions, self.obstacle_alive):
+            if alive:
+                self.surface.blit(sprites['obstacle'], (x - 10, y - 10))
+        self.checkpoint_manager.draw(self.surface)
+
+        car = self.car
+        if not self.car_finished and not self.car_crashed:
+            for point in car.ray_collision_points:
+                if point:
+                    pygame.draw.line(self.surface, GREEN, (int(car.x), int(car.y)), (int(point[0]), int(point[1])), 2)
+                    pygame.draw.circle(self.surface, WHITE, (int(point[0]), int(point[1])), 3)
+
+        self.surface.blit(sprites['border'], (0, 0))
+        car_image = pygame.transform.rotate(sprites['car'], car.bucket * ROTATION_STEP)
+        self.surface.blit(car_image, car.topleft)
+        self.surface.blit(sprites['finish'], self.track.finish_position)
+
+        # Simple UI
+        font = pygame.font.Font(None, 24)
+
+        time_color = GREEN if self.time_remaining > 10 else (YELLOW if self.time_remaining > 3 else RED)
+        time_text = font.render(f"Time: {self.time_remaining:.1f}s", True, time_color)
+        self.surface.blit(time_text, (10, 10))
+
+        cp_text = font.render(f"CP: {self.checkpoint_manager.crossed_count}/16", True, WHITE)
+        self.surface.blit(cp_text, (10, 40))
+
+        speed_ratio = car.velocity / car.max_velocity if car.max_velocity > 0 else 0
+        speed_text = font.render(f"Speed: {speed_ratio:.1%}", True, WHITE)
+        self.surface.blit(speed_text, (10, 70))
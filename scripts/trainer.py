@@ -8,71 +8,29 @@ import torch
 import wandb
 from collections import deque
 
-from scripts.AIEnvironment import AIEnvironment
+from scripts.simcore import HeadlessAIEnvironment
+from scripts.vecenv import VecAIEnvironment
+from scripts.actors import ActorPool
 from scripts.Constants import *
 from scripts.dqn_agent import DQNAgent
+from scripts.rewards import calculate_reward, calculate_rewards
 from scripts.GameManager import game_state_manager
+from scripts.profiling import profiler, Profiler
 
 STATE_DIM = 14  # 11 rays + 1 velocity + 2 orientation
 ACTION_DIM = 6  # 6 actions (no backward)
 
 
-def calculate_reward(environment, step_info):
-    """Simple reward calculation"""
-    reward = 0.0
-    
-    # 1. Speed reward (encourage moving fast)
-    speed_ratio = abs(environment.car.velocity) / environment.car.max_velocity
-    if speed_ratio >= 0.8:
-        reward += 1.5
-    elif speed_ratio >= 0.5:
-        reward += 0.5
-    else:
-        reward -= 0.5
-    
-    # 2. Edge penalty (stay away from walls)
-    if environment.car.ray_distances:
-        min_ray = min(environment.car.ray_distances) / environment.car.ray_length
-        if min_ray < 0.1:
-            reward -= 2.0
-        elif min_ray < 0.2:
-            reward -= 0.5
-    
-    # 3. Checkpoint crossed (big reward!)
-    if step_info.get("checkpoint_crossed", False):
-        reward += 50.0
-    
-    # 4. Backward crossing (bad!)
-    if step_info.get("backward_crossed", False):
-        reward -= 30.0
-    
-    # 5. Hit obstacle
-    if step_info.get("hit_obstacle", False):
-        reward -= 10.0
-    
-    # 6. Finished race (huge reward!)
-    if step_info.get("finished", False):
-        reward += 500.0
-        # Time bonus
-        time_ratio = environment.time_remaining / environment.max_time
-        reward += time_ratio * 200.0
-    
-    # 7. Crashed (big penalty)
-    if step_info.get("collision", False):
-        reward -= 200.0
-    
-    # 8. Timeout
-    if step_info.get("timeout", False):
-        reward -= 100.0
-    
-    return float(reward)
-
-
 class Trainer:
-    def __init__(self, display, clock, run_number=1):
-        self.display = display
+    def __init__(self, display, clock, run_number=1, num_envs=1, num_actors=NUM_ACTORS, model_path=None):
+        self.display = display  # may be None when driven headless (train.py)
         self.clock = clock
         self.run_number = run_number
+        self.model_path = model_path  # checkpoint file, defaults to the agent's models/actions_6/model.pt
+        self.num_envs = num_envs  # > 1 steps a VecAIEnvironment (no visualization)
+        
+        # Actor processes collect experience when num_actors > 0 (no visualization)
+        self.actor_pool = ActorPool(num_actors) if num_actors > 0 else None
         
         # Game components
         self.environment = None
@@ -83,6 +41,7 @@ class Trainer:
         self.steps = 0
         self.episode_reward = 0.0
         self.state = None
+        self.episode_rewards = None  # per car, num_envs > 1
         
         # Stats (last 100 episodes)
         self.rewards_100 = deque(maxlen=100)
@@ -93,6 +52,15 @@ class Trainer:
         self.best_finish_time = 0.0
         self.best_finish_episode = 0
         
+        # Hot-path timings of the last logged episode (PROFILE = True)
+        self.profile_stats = {}
+        
+        # Throughput (env steps/s and updates/s, refreshed at most once a second)
+        self._rate_mark = None
+        self._milestone_mark = None
+        self.env_steps_per_sec = 0.0
+        self.updates_per_sec = 0.0
+        
         # Visualization
         self.show_viz = False
         
@@ -109,12 +77,25 @@ class Trainer:
         # Disable audio
         pygame.mixer.quit()
         
-        # Create environment
-        self.environment = AIEnvironment(self.display)
+        # Create environment (pygame-free core; the display is only used for visualization)
+        if self.actor_pool:
+            self.environment = None  # actors own their environments
+        elif self.num_envs > 1:
+            self.environment = VecAIEnvironment(self.num_envs, reward_fn=calculate_rewards)
+        else:
+            self.environment = HeadlessAIEnvironment(self.display, reward_fn=calculate_reward)
         
         # Create agent
         device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        self.agent = DQNAgent(STATE_DIM, ACTION_DIM, device=device)
+        self.agent = DQNAgent(STATE_DIM, ACTION_DIM, device=device, prioritized_replay=PRIORITIZED_REPLAY, n_step=N_STEP,
+                              train_freq=TRAIN_FREQ, gradient_steps=GRADIENT_STEPS, learning_starts=LEARNING_STARTS,
+                              numpy_inference=NUMPY_INFERENCE, compiled=COMPILED_LEARNER,
+                              tau=TARGET_TAU)
+        if self.model_path:
+            self.agent.model_dir = os.path.dirname(self.model_path) or "."
+            os.makedirs(self.agent.model_dir, exist_ok=True)
+            self.agent.model_path = self.model_path
+            self.agent.best_model_path = os.path.join(self.agent.model_dir, "best_model.pt")
         
         # Load checkpoint if exists
         if os.path.exists(self.agent.model_path):
@@ -131,7 +112,9 @@ class Trainer:
         self._init_wandb()
         
         # Start first episode
-        self._reset_episode()
+        if self.environment:
+            self._reset_episode()
+        self._milestone_mark = (time.perf_counter(), self.agent.env_steps)
     
     def _init_wandb(self):
         """Initialize WandB tracking"""
@@ -146,6 +129,16 @@ class Trainer:
             "epsilon_decay": self.agent.epsilon_decay,
             "epsilon_min": self.agent.epsilon_min,
             "target_update": self.agent.target_update,
+            "target_tau": self.agent.tau,
+            "num_envs": self.num_envs,
+            "prioritized_replay": self.agent.prioritized_replay,
+            "n_step": self.agent.n_step,
+            "train_freq": self.agent.train_freq,
+            "gradient_steps": self.agent.gradient_steps,
+            "learning_starts": self.agent.learning_starts,
+            "action_repeat": ACTION_REPEAT,
+            "compiled_learner": self.agent.compiled,
+            "num_actors": self.actor_pool.num_actors if self.actor_pool else 0,
             "device": str(self.agent.device)
         }
         
@@ -159,6 +152,10 @@ class Trainer:
     
     def _reset_episode(self):
         """Start new episode"""
+        if self.num_envs > 1:
+            self.state = self.environment.reset()
+            self.episode_rewards = np.zeros(self.num_envs)
+            return
         self.environment.reset()
         self.steps = 0
         self.episode_reward = 0.0
@@ -169,13 +166,19 @@ class Trainer:
         cp_count = self.environment.checkpoint_manager.crossed_count
         finished = self.environment.car_finished
         time_left = self.environment.time_remaining if finished else 0.0
+        self._record_episode(self.episode_reward, cp_count, finished, self.environment.car_crashed, time_left)
         
+        # Reset for next episode
+        self._reset_episode()
+    
+    def _record_episode(self, episode_reward, cp_count, finished, crashed, time_left):
+        """Agent bookkeeping, stats, logging and periodic saves for one finished episode"""
         # Update agent
-        self.agent.end_episode(self.episode_reward, cp_count, time_left, finished)
+        self.agent.end_episode(episode_reward, cp_count, time_left, finished)
         self.episode = self.agent.episode_count
         
         # Update stats
-        self.rewards_100.append(self.episode_reward)
+        self.rewards_100.append(episode_reward)
         self.checkpoints_100.append(cp_count)
         self.finishes_100.append(finished)
         
@@ -187,12 +190,25 @@ class Trainer:
         # Log to WandB
         log_dict = {
             "episode": self.episode,
-            "reward": self.episode_reward,
+            "reward": episode_reward,
             "checkpoints": cp_count,
             "finished": int(finished),
             "epsilon": self.agent.epsilon,
+            "env_steps": self.agent.env_steps,
+            "updates": self.agent.train_step,
         }
         
+        self._update_throughput()
+        log_dict["env_steps_per_sec"] = self.env_steps_per_sec
+        log_dict["updates_per_sec"] = self.updates_per_sec
+        
+        # Scope timings since the previous logged episode
+        if profiler.enabled:
+            stats = profiler.summary()
+            if stats:
+                self.profile_stats = stats
+                log_dict.update(Profiler.log_dict(stats))
+        
         if finished:
             log_dict["finish_time"] = 25.0 - time_left
         
@@ -202,11 +218,12 @@ class Trainer:
             log_dict["avg_checkpoints_100"] = float(np.mean(self.checkpoints_100))
             log_dict["win_rate_100"] = sum(self.finishes_100)
         
-        wandb.log(log_dict)
+        with profiler.scope('log'):
+            wandb.log(log_dict)
         
         # Print status
-        status = "✓ FINISH" if finished else ("💥 CRASH" if self.environment.car_crashed else "⏱️ TIMEOUT")
-        print(f"Ep {self.episode:4d} | {status:10s} | CP: {cp_count:2d}/16 | R: {self.episode_reward:7.1f} | ε: {self.agent.epsilon:.3f}")
+        status = "✓ FINISH" if finished else ("💥 CRASH" if crashed else "⏱️ TIMEOUT")
+        print(f"Ep {self.episode:4d} | {status:10s} | CP: {cp_count:2d}/16 | R: {episode_reward:7.1f} | ε: {self.agent.epsilon:.3f}")
         
         # Save periodically
         if self.episode % 50 == 0:
@@ -216,9 +233,6 @@ class Trainer:
         # Milestone every 100 episodes
         if self.episode % 100 == 0:
             self._print_milestone()
-        
-        # Reset for next episode
-        self._reset_episode()
     
     def _print_milestone(self):
         """Print 100-episode summary"""
@@ -233,13 +247,80 @@ class Trainer:
         print(f"  Avg Checkpoints: {avg_cp:.1f}/16 ({avg_cp/16*100:.1f}%)")
         if self.best_finish_time > 0:
             print(f"  Best Time: {25.0 - self.best_finish_time:.2f}s (Ep {self.best_finish_episode})")
+        print(f"  Env steps: {self.agent.env_steps} ({self.env_steps_per_sec:.0f}/s) | Updates: {self.agent.train_step} ({self.updates_per_sec:.0f}/s)")
+        if self._milestone_mark is not None:
+            then, env_steps = self._milestone_mark
+            now = time.perf_counter()
+            print(f"  Steps/s since last milestone: {(self.agent.env_steps - env_steps) / max(now - then, 1e-9):.0f}")
+            self._milestone_mark = (now, self.agent.env_steps)
+        if self.profile_stats:
+            print("  Hot path (last episode):")
+            for line in Profiler.format(self.profile_stats):
+                print("    " + line)
         print("="*60 + "\n")
     
+    def _update_throughput(self):
+        """Refresh env-steps/s and updates/s if at least a second passed since the last refresh"""
+        now = time.perf_counter()
+        if self._rate_mark is None:
+            self._rate_mark = (now, self.agent.env_steps, self.agent.train_step)
+            return
+        then, env_steps, updates = self._rate_mark
+        if now - then < 1.0:
+            return
+        self.env_steps_per_sec = (self.agent.env_steps - env_steps) / (now - then)
+        self.updates_per_sec = (self.agent.train_step - updates) / (now - then)
+        self._rate_mark = (now, self.agent.env_steps, self.agent.train_step)
+    
     def run(self, dt):
         """Main training loop"""
-        if not self.environment:
+        if not self.agent:
             self.initialize()
         
+        # Handle input
+        with profiler.scope('events'):
+            self._handle_events()
+        
+        self.train_step()
+        
+        # Draw
+        with profiler.scope('draw'):
+            self.draw()
+    
+    def train_step(self):
+        """One training step of whichever mode is active (actors, vectorized or single env)"""
+        if self.actor_pool:
+            self._actor_step()
+        elif self.num_envs > 1:
+            self._vec_step()
+        elif not self.environment.episode_ended:
+            # Get action
+            with profiler.scope('act'):
+                action = self.agent.get_action(self.state, training=True)
+            
+            # Execute step (ACTION_REPEAT frames, reward summed over them)
+            with profiler.scope('env_step'):
+                next_state, step_info, done = self.environment.step(action)
+            reward = step_info['reward']
+            
+            # Store experience
+            with profiler.scope('store'):
+                self.agent.store_experience(self.state, action, reward, next_state, done)
+            
+            # Update network (on the agent's train_freq / gradient_steps schedule)
+            with profiler.scope('update'):
+                self.agent.train()
+            
+            # Update state
+            self.steps += 1
+            self.episode_reward += reward
+            self.state = next_state
+        else:
+            # Episode ended
+            self._end_episode()
+    
+    def _handle_events(self):
+        """V toggles visualization, ESC returns to the menu, closing the window quits"""
         # Handle input (check every frame for V key)
         keys = pygame.key.get_pressed()
         if keys[pygame.K_v]:
@@ -258,34 +339,10 @@ class Trainer:
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     self._return_to_menu()
-        
-        # Training step
-        if not self.environment.episode_ended:
-            # Get action
-            action = self.agent.get_action(self.state, training=True)
-            
-            # Execute step
-            next_state, step_info, done = self.environment.step(action)
-            
-            # Calculate reward
-            reward = calculate_reward(self.environment, step_info)
-            
-            # Store experience
-            self.agent.store_experience(self.state, action, reward, next_state, done)
-            
-            # Update network
-            self.agent.update()
-            
-            # Update state
-            self.steps += 1
-            self.episode_reward += reward
-            self.state = next_state
-        else:
-            # Episode ended
-            self._end_episode()
-        
-        # Draw
-        if self.show_viz:
+    
+    def draw(self):
+        """Visualization, or a status screen when it is off"""
+        if self.show_viz and self.num_envs == 1 and not self.actor_pool:
             self.environment.draw()
             self._draw_overlay()
         else:
@@ -304,6 +361,47 @@ class Trainer:
         
         pygame.display.update()
     
+    def _vec_step(self):
+        """One step of every car: one forward pass for N actions, N transitions stored"""
+        env = self.environment
+        with profiler.scope('act'):
+            actions = self.agent.get_actions(self.state, training=True)
+        with profiler.scope('env_step'):
+            next_states, infos, dones = env.step(actions)
+        rewards = infos['reward']
+        
+        with profiler.scope('store'):
+            self.agent.store_experiences(self.state, actions, rewards, infos['terminal_state'], dones)
+        with profiler.scope('update'):
+            self.agent.train(self.num_envs)
+        
+        self.steps += 1
+        self.episode_rewards += rewards
+        for i in np.flatnonzero(dones):
+            finished = bool(infos['finished'][i])
+            time_left = float(infos['time_remaining'][i]) if finished else 0.0
+            self._record_episode(float(self.episode_rewards[i]), int(infos['checkpoints'][i]),
+                                 finished, bool(infos['collision'][i]), time_left)
+            self.episode_rewards[i] = 0.0
+        self.state = next_states
+    
+    def _actor_step(self):
+        """Learner side: store what the actors collected, train on it, share weights"""
+        if not self.actor_pool.processes:
+            self.actor_pool.start(self.agent)
+        
+        received = self.actor_pool.transitions_received
+        with profiler.scope('store'):
+            episodes = self.actor_pool.drain(self.agent)
+        for stats in episodes:
+            self._record_episode(stats['reward'], stats['checkpoints'], stats['finished'],
+                                 stats['crashed'], stats['time_left'])
+        with profiler.scope('update'):
+            self.agent.train(self.actor_pool.transitions_received - received)
+        with profiler.scope('sync'):
+            self.actor_pool.sync(self.agent)
+        self.steps += 1
+    
     def _draw_overlay(self):
         """Draw training info overlay"""
         panel = pygame.Surface((250, 200), pygame.SRCALPHA)
@@ -332,20 +430,25 @@ class Trainer:
         
         self.display.blit(panel, (self.display.get_width() - 260, 10))
     
+    def shutdown(self):
+        """Final checkpoint, stop the actors and close the WandB run"""
+        self.agent.save_model(wait=True)
+        if self.actor_pool:
+            self.actor_pool.close()
+        wandb.finish()
+    
     def _return_to_menu(self):
         """Save and return to menu"""
         print("\nSaving and returning to menu...")
-        self.agent.save_model()
-        wandb.finish()
+        self.shutdown()
         game_state_manager.setState('main_menu')
     
     def _save_and_exit(self):
         """Save and quit"""
         print("\nSaving model...")
-        self.agent.save_model()
+        self.shutdown()
         print(f"Trained for {self.episode} episodes")
         if self.best_finish_time > 0:
             print(f"Best: {25.0 - self.best_finish_time:.2f}s (Ep {self.best_finish_episode})")
-        wandb.finish()
         pygame.quit()
         sys.exit(0)
\ No newline at end of file
@@ -0,0 +1,361 @@
+# vecenv.py - N independent training cars stepped as numpy arrays
+# Same rules as HeadlessAIEnvironment, stored struct-of-arrays so one
+# step() advances every car with a handful of vectorized operations.
+import random
+import numpy as np
+
+from scripts.SimConstants import *
+from scripts.simcore import load_track, OBSTACLE_HALF_SIZE, INFO_KEYS
+from scripts.raycast import RayCaster
+from scripts.profiling import profiler
+
+STATE_DIM = 14  # 11 rays + 1 velocity + 2 orientation
+
+# Action decoding (environment action codes 0-8, see AIEnvironment._handle_car_movement)
+_TURN = np.array([0, 0, 0, 1, -1, 1, -1, 1, -1], dtype=np.float64)
+_FORWARD = np.array([0, 1, 0, 0, 0, 1, 1, 0, 0], dtype=bool)
+_BACKWARD = np.array([0, 0, 1, 0, 0, 0, 0, 1, 1], dtype=bool)
+
+
+class VecAIEnvironment:
+    """
+    num_envs cars, each with its own obstacle layout, checkpoint progress
+    and timer. step(actions) returns (states[N, 14], infos, dones[N]) and
+    resets finished episodes automatically:
+    - states holds the first observation of the new episode for done envs
+    - infos['terminal_state'] holds the last observation of every env
+    - infos[key] for key in INFO_KEYS are bool arrays, plus the terminal
+      'velocity', 'min_ray' and 'time_remaining' used for rewards
+    Each step holds the actions for action_repeat frames; a car whose episode
+    ends on an earlier frame sits out the rest. With a reward_fn (e.g.
+    rewards.calculate_rewards) infos['reward'] is the per-car summed reward.
+    """
+    def __init__(self, num_envs, num_obstacles=15, track=None, action_repeat=ACTION_REPEAT, reward_fn=None):
+        self.num_envs = num_envs
+        self.action_repeat = max(1, int(action_repeat))
+        self.reward_fn = reward_fn
+        self.num_obstacles = num_obstacles
+        self.track = track if track is not None else load_track()
+        self.field = self.track.field
+        self.field.distance  # built up front, the border prefilter reads it every step
+
+        self.ray_length = RAY_LENGTH
+        self.ray_caster = RayCaster(RAY_ANGLES, RAY_LENGTH)
+        self.max_velocity = MAXSPEED
+        self.max_time = TARGET_TIME
+
+        # Car mask pixels per rotation bucket, padded: (B, P, 2) offsets + (B, P) valid flags
+        pixels = [np.argwhere(self.track.car_masks[b]) for b in range(self.track.buckets)]
+        size = max(len(p) for p in pixels)
+        self.mask_pixels = np.zeros((self.track.buckets, size, 2), dtype=np.intp)
+        self.mask_valid = np.zeros((self.track.buckets, size), dtype=bool)
+        for b, p in enumerate(pixels):
+            self.mask_pixels[b, :len(p)] = p
+            self.mask_valid[b, :len(p)] = True
+        self.car_sizes = np.array(self.track.car_sizes, dtype=np.intp)
+        self.finish_position = np.array(self.track.finish_position, dtype=np.intp)
+        self.box_offsets = np.arange(2 * OBSTACLE_HALF_SIZE)
+
+        # Checkpoint segments (Z, 2) per end point
+        zones = np.array(TRACK_CHECKPOINT_ZONES, dtype=np.float64)
+        self.zone_p1, self.zone_p2 = zones[:, 0], zones[:, 1]
+        self.total_checkpoints = len(zones)
+
+        n = num_envs
+        # Car
+        self.x = np.zeros(n)
+        self.y = np.zeros(n)
+        self.angle = np.zeros(n)
+        self.velocity = np.zeros(n)
+        self.can_move = np.ones(n, dtype=bool)
+        # Episode
+        self.time_remaining = np.zeros(n)
+        self.car_finished = np.zeros(n, dtype=bool)
+        self.car_crashed = np.zeros(n, dtype=bool)
+        self.car_timeout = np.zeros(n, dtype=bool)
+        # Checkpoints
+        self.checkpoint_idx = np.zeros(n, dtype=np.intp)
+        self.prev_x = np.zeros(n)
+        self.prev_y = np.zeros(n)
+        self.has_prev = np.zeros(n, dtype=bool)
+        # Obstacles: centres (N, K, 2) and alive flags (N, K)
+        self.obstacle_positions = np.zeros((n, num_obstacles, 2), dtype=np.intp)
+        self.obstacle_alive = np.zeros((n, num_obstacles), dtype=bool)
+
+        # Episode statistics
+        self.episode_steps = np.zeros(n, dtype=np.int64)
+
+        self.ray_distances = np.full((n, len(RAY_ANGLES)), float(RAY_LENGTH))
+        self.states = np.zeros((n, STATE_DIM), dtype=np.float32)
+        self.reset()
+
+    # ------------------------------------------------------------------
+    # Reset
+    # ------------------------------------------------------------------
+
+    def reset(self):
+        """Reset every env and return states[N, 14]"""
+        self._reset_envs(np.arange(self.num_envs))
+        self.states = self._observe()
+        return self.states
+
+    def _reset_envs(self, envs):
+        start_x, start_y = CAR_START_POS
+        self.x[envs] = start_x
+        self.y[envs] = start_y
+        self.angle[envs] = 0.0
+        self.velocity[envs] = 0.0
+        self.can_move[envs] = True
+        self.time_remaining[envs] = self.max_time
+        self.car_finished[envs] = False
+        self.car_crashed[envs] = False
+        self.car_timeout[envs] = False
+        self.checkpoint_idx[envs] = 0
+        self.has_prev[envs] = False
+        self.episode_steps[envs] = 0
+        for env in np.atleast_1d(envs).tolist():
+            self.obstacle_positions[env] = random.sample(BOMB_LIST, self.num_obstacles)
+        self.obstacle_alive[envs] = True
+
+    # ------------------------------------------------------------------
+    # Step
+    # ------------------------------------------------------------------
+
+    def step(self, actions):
+        actions = np.asarray(actions, dtype=np.intp)
+        n = self.num_envs
+
+        # A car's last frame (episode end or final repeat) is rewarded after the
+        # sensors are cast, the frames before it on the previous readings
+        infos = {key: np.zeros(n, dtype=bool) for key in INFO_KEYS}
+        last_frame = {key: np.zeros(n, dtype=bool) for key in INFO_KEYS}
+        rewards = np.zeros(n)
+        running = np.ones(n, dtype=bool)
+        for frame in range(self.action_repeat):
+            frame_info = self._frame(actions, running)
+            dones = self.car_finished | self.car_crashed | self.car_timeout
+            ending = running & dones if frame < self.action_repeat - 1 else running
+            for key in INFO_KEYS:
+                infos[key] |= frame_info[key]
+                last_frame[key] = np.where(ending, frame_info[key], last_frame[key])
+            running &= ~ending
+            if self.reward_fn is not None and running.any():
+                frame_info.update(self._reward_inputs())
+                with profiler.scope('reward'):
+                    rewards += np.where(running, self.reward_fn(self, frame_info), 0.0)
+            if not running.any():
+                break
+
+        terminal_states = self._observe()
+        infos.update(self._reward_inputs())
+        infos['checkpoints'] = self.checkpoint_idx.copy()
+        infos['episode_steps'] = self.episode_steps.copy()
+        infos['terminal_state'] = terminal_states
+        if self.reward_fn is not None:
+            last_frame.update(self._reward_inputs())
+            with profiler.scope('reward'):
+                infos['reward'] = rewards + self.reward_fn(self, last_frame)
+
+        if dones.any():
+            # Only the cars that were reset need their sensors cast again
+            reset = np.flatnonzero(dones)
+            self._reset_envs(reset)
+            self.states = terminal_states.copy()
+            self.states[reset] = self._observe(reset)
+        else:
+            self.states = terminal_states
+        return self.states, infos, dones
+
+    def _frame(self, actions, running):
+        """One 1/FPS frame for the running cars; the others keep their state and report no events"""
+        pre_velocity = self.velocity.copy()
+
+        self._move(actions, running)
+        crossed, backward = self._check_crossing(running)
+        hit_obstacle = self._check_obstacles(pre_velocity, running)
+        finished, collision = self._check_finish_and_collision(running)
+
+        self.time_remaining = np.where(running, np.maximum(0, self.time_remaining - 1/FPS), self.time_remaining)
+        timeout = running & (self.time_remaining <= 0) & ~self.car_finished & ~self.car_crashed
+        self.can_move &= ~timeout
+        self.car_timeout |= timeout
+        self.episode_steps += running
+
+        return {
+            'collision': collision,
+            'finished': finished,
+            'hit_obstacle': hit_obstacle,
+            'timeout': timeout,
+            'checkpoint_crossed': crossed,
+            'backward_crossed': backward,
+        }
+
+    def _reward_inputs(self):
+        return {
+            'velocity': self.velocity.copy(),
+            'min_ray': self.ray_distances.min(axis=1) / self.ray_length,
+            'time_remaining': self.time_remaining.copy(),
+        }
+
+    def _move(self, actions, running):
+        """Car.rotate + accelerate/reduce_speed + move for every running car that can move"""
+        active = self.can_move & running
+        v = self.velocity
+
+        turn = _TURN[actions] * active
+        self.angle += turn * ROTATESPEED * (0.4 + 0.6 * (np.abs(v) / self.max_velocity))
+
+        forward = _FORWARD[actions] & active
+        backward = _BACKWARD[actions] & active
+        coast = active & ~forward & ~backward
+        v = np.where(forward, np.minimum(v + ACCELERATION, self.max_velocity), v)
+        v = np.where(backward, np.maximum(v - ACCELERATION, -self.max_velocity / 2), v)
+        v = np.where(coast & (v > 0), np.maximum(v - ACCELERATION * 0.3, 0), v)
+        v = np.where(coast & (v < 0), np.minimum(v + ACCELERATION * 0.3, 0), v)
+        self.velocity = v
+
+        radians = np.radians(self.angle)
+        self.x -= np.sin(radians) * v * active
+        self.y -= np.cos(radians) * v * active
+
+    def _check_crossing(self, running):
+        """CheckpointManager.check_crossing for every running car"""
+        n = self.num_envs
+        px, py = self.prev_x[:, None], self.prev_y[:, None]
+        cx, cy = self.x[:, None], self.y[:, None]
+        x3, y3 = self.zone_p1[:, 0], self.zone_p1[:, 1]
+        x4, y4 = self.zone_p2[:, 0], self.zone_p2[:, 1]
+
+        denom = (px - cx) * (y3 - y4) - (py - cy) * (x3 - x4)
+        parallel = np.abs(denom) < 1e-10
+        denom = np.where(parallel, 1.0, denom)
+        t = ((px - x3) * (y3 - y4) - (py - y3) * (x3 - x4)) / denom
+        u = -((px - cx) * (py - y3) - (py - cy) * (px - x3)) / denom
+        hits = ~parallel & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)              # (N, Z)
+
+        idx = self.checkpoint_idx
+        checking = running & self.has_prev & (idx < self.total_checkpoints)
+        crossed = checking & hits[np.arange(n), np.minimum(idx, self.total_checkpoints - 1)]
+        cleared = np.arange(self.total_checkpoints) < idx[:, None]
+        backward = checking & ~crossed & (hits & cleared).any(axis=1)
+
+        self.checkpoint_idx = idx + crossed
+        self.prev_x = self.x.copy()
+        self.prev_y = self.y.copy()
+        self.has_prev[:] = True
+        return crossed, backward
+
+    def _buckets_and_topleft(self):
+        buckets = np.round(self.angle / ROTATION_STEP).astype(np.intp) % self.track.buckets
+        sizes = self.car_sizes[buckets]
+        # pygame Rect centres round half away from zero
+        cx = (np.sign(self.x) * np.floor(np.abs(self.x) + 0.5)).astype(np.intp)
+        cy = (np.sign(self.y) * np.floor(np.abs(self.y) + 0.5)).astype(np.intp)
+        return buckets, cx - sizes[:, 0] // 2, cy - sizes[:, 1] // 2
+
+    def _check_obstacles(self, pre_velocity, running):
+        """First alive obstacle whose hitbox overlaps the car mask is destroyed"""
+        buckets, left, top = self._buckets_and_topleft()
+        sizes = self.car_sizes[buckets]
+
+        # Hitboxes in car-mask coordinates; only those touching the sprite rect need a pixel test
+        x0 = self.obstacle_positions[..., 0] - OBSTACLE_HALF_SIZE - left[:, None]  # (N, K)
+        y0 = self.obstacle_positions[..., 1] - OBSTACLE_HALF_SIZE - top[:, None]
+        span = 2 * OBSTACLE_HALF_SIZE
+        near = (self.obstacle_alive & running[:, None] & (x0 + span > 0) & (y0 + span > 0) &
+                (x0 < sizes[:, 0, None]) & (y0 < sizes[:, 1, None]))
+        touching = np.zeros_like(near)
+        if near.any():
+            env, k = np.nonzero(near)
+            masks = self.track.car_masks
+            bx = x0[env, k, None, None] + self.box_offsets[:, None]              # (M, 10, 10)
+            by = y0[env, k, None, None] + self.box_offsets
+            inside = (bx >= 0) & (bx < masks.shape[1]) & (by >= 0) & (by < masks.shape[2])
+            pixels = masks[buckets[env, None, None], np.where(inside, bx, 0), np.where(inside, by, 0)]
+            touching[env, k] = (pixels & inside).any(axis=(1, 2))
+
+        hit_env = touching.any(axis=1)
+        first = touching.argmax(axis=1)
+        envs = np.flatnonzero(hit_env)
+        self.obstacle_alive[envs, first[envs]] = False
+        self.velocity = np.where(hit_env, self.velocity * 0.25, self.velocity)
+        return hit_env & (pre_velocity > 1.0)
+
+    def _check_finish_and_collision(self, running):
+        """_check_finish followed by _check_collision, on every running car's mask pixels"""
+        n = self.num_envs
+        buckets, left, top = self._buckets_and_topleft()
+        sizes = self.car_sizes[buckets]
+        field = self.field
+        finish = self.track.finish
+        fx0, fy0 = self.finish_position
+
+        # Pixel tests only for cars near the border (distance field at the centre
+        # within the sprite's half-diagonal) or whose sprite rect touches the finish
+        cx, cy = left + sizes[:, 0] // 2, top + sizes[:, 1] // 2
+        on_field = (cx >= 0) & (cx < field.width) & (cy >= 0) & (cy < field.height)
+        clearance = field.distance[np.where(on_field, cx, 0), np.where(on_field, cy, 0)]
+        near_border = ~on_field | (clearance <= np.hypot(sizes[:, 0], sizes[:, 1]) / 2 + 1)
+        near_finish = ((left < fx0 + finish.shape[0]) & (left + sizes[:, 0] > fx0) &
+                       (top < fy0 + finish.shape[1]) & (top + sizes[:, 1] > fy0))
+        envs = np.flatnonzero(running & (near_border | near_finish))
+
+        border_hit = np.zeros(n, dtype=bool)
+        finish_touch = np.zeros(n, dtype=bool)
+        first_y = np.zeros(n, dtype=np.intp)
+        if len(envs):
+            b = buckets[envs]
+            valid = self.mask_valid[b]
+            px = self.mask_pixels[b, :, 0] + left[envs, None]                      # (M, P)
+            py = self.mask_pixels[b, :, 1] + top[envs, None]
+
+            # Border overlap
+            on_image = valid & (px >= 0) & (px < field.width) & (py >= 0) & (py < field.height)
+            border_px = field.occupancy[np.where(on_image, px, 0), np.where(on_image, py, 0)]
+            border_hit[envs] = (border_px & on_image).any(axis=1)
+
+            # Finish overlap, reporting the same first pixel as pygame's Mask.overlap
+            fx, fy = px - fx0, py - fy0
+            on_finish = valid & (fx >= 0) & (fx < finish.shape[0]) & (fy >= 0) & (fy < finish.shape[1])
+            finish_px = finish[np.where(on_finish, fx, 0), np.where(on_finish, fy, 0)] & on_finish
+            finish_touch[envs] = finish_px.any(axis=1)
+            order = np.where(finish_px, (fx // self.track.overlap_word) * finish.shape[1] + fy,
+                             np.iinfo(np.intp).max)
+            first_y[envs] = order.min(axis=1) % finish.shape[1]
+
+        finished = ~self.car_finished & ~self.car_crashed & finish_touch & (first_y > 2)
+        self.car_finished |= finished
+
+        collision = ~self.car_crashed & (border_hit | (finish_touch & (first_y <= 2)))
+        self.car_crashed |= collision
+        self.can_move &= ~collision
+        return finished, collision
+
+    # ------------------------------------------------------------------
+    # Observation
+    # ------------------------------------------------------------------
+
+    def obstacle_boxes(self):
+        """(N, K, 4) hitboxes; destroyed obstacles collapse to empty boxes"""
+        x = self.obstacle_positions[..., 0]
+        y = self.obstacle_positions[..., 1]
+        half = OBSTACLE_HALF_SIZE * self.obstacle_alive
+        return np.stack((x - half, y - half, x + half, y + half), axis=-1)
+
+    def _observe(self, envs=None):
+        """Cast the sensors of every car (or only those in envs) and return their states"""
+        if envs is None:
+            envs = slice(None)
+        positions = np.stack((self.x[envs], self.y[envs]), axis=1)
+        with profiler.scope('get_state'):
+            distances, _ = self.ray_caster.cast_batch(self.field, positions, self.angle[envs],
+                                                      self.obstacle_boxes()[envs])
+        self.ray_distances[envs] = distances
+
+        states = np.empty((len(positions), STATE_DIM), dtype=np.float32)
+        states[:, :len(RAY_ANGLES)] = distances / self.ray_length
+        states[:, len(RAY_ANGLES)] = np.maximum(0.0, self.velocity[envs] / self.max_velocity)
+        radians = np.radians(self.angle[envs])
+        states[:, len(RAY_ANGLES) + 1] = np.sin(radians)
+        states[:, len(RAY_ANGLES) + 2] = np.cos(radians)
+        return states
@@ -0,0 +1,76 @@
+# train.py - headless training entry point (no window, no 60 FPS clock, no event polling)
+# Run from the repository root:
+#   python train.py --run 2 --episodes 5000 [--checkpoint models/run2/model.pt]
+#                   [--num-envs 16 | --num-actors 4] [--render-every 100]
+import argparse
+import os
+import sys
+import time
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the DQN racer as fast as the machine allows")
+    parser.add_argument('--run', type=int, default=1, help="run number (WandB run name Racing_DQN_<run>)")
+    parser.add_argument('--episodes', type=int, default=1000, help="episodes to train in this invocation")
+    parser.add_argument('--checkpoint', default=None,
+                        help="checkpoint file to resume from and save to (default models/actions_6/model.pt)")
+    parser.add_argument('--num-envs', type=int, default=1, help="cars stepped together by a VecAIEnvironment")
+    parser.add_argument('--num-actors', type=int, default=None,
+                        help="actor processes collecting experience (default NUM_ACTORS)")
+    parser.add_argument('--render-every', type=int, default=0, metavar='N',
+                        help="open a window and draw every Nth episode (single env only, 0 = never)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    render = args.render_every > 0
+    if not render:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+    import pygame
+    from scripts.Constants import WIDTH, HEIGHT, NUM_ACTORS
+    from scripts.trainer import Trainer
+
+    num_actors = NUM_ACTORS if args.num_actors is None else args.num_actors
+    if render and (args.num_envs > 1 or num_actors > 0):
+        print("--render-every only applies to single-env training, ignoring it")
+        render = False
+
+    display = None
+    if render:
+        display = pygame.display.set_mode((WIDTH, HEIGHT))
+        pygame.display.set_caption("Racing DQN - training")
+
+    trainer = Trainer(display, None, run_number=args.run, num_envs=args.num_envs, num_actors=num_actors,
+                      model_path=args.checkpoint)
+    trainer.initialize()
+    last_episode = trainer.episode + args.episodes
+    start_time = time.perf_counter()
+    start_steps = trainer.agent.env_steps
+
+    try:
+        while trainer.episode < last_episode:
+            trainer.train_step()
+            if render:
+                # Draw the whole of every Nth episode; keep the window responsive
+                trainer.show_viz = (trainer.episode + 1) % args.render_every == 0
+                if trainer.show_viz:
+                    trainer.draw()
+                    pygame.event.pump()
+    except KeyboardInterrupt:
+        print("\nInterrupted")
+    finally:
+        elapsed = time.perf_counter() - start_time
+        steps = trainer.agent.env_steps - start_steps
+        print(f"\nSaving {trainer.agent.model_path} ...")
+        trainer.shutdown()
+        print(f"Trained to episode {trainer.episode}: {steps} env steps in {elapsed:.0f}s "
+              f"({steps / max(elapsed, 1e-9):.0f} steps/s)")
+        pygame.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())